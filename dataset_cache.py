@@ -0,0 +1,134 @@
+"""
+Columnar cache for the threat dataset workbook.
+
+Parsing the .xlsx with openpyxl dominates cold start for both the backend
+and the Streamlit dashboard. The first load converts the workbook to an
+Arrow/Feather file next to it; later loads memory-map that file instead.
+The cache is rebuilt when the workbook's size/mtime change and its SHA-256
+no longer matches.
+
+Build (or refresh) the cache ahead of time:
+    python dataset_cache.py data/cyber_threat_dataset.xlsx
+"""
+import hashlib
+import json
+import os
+import sys
+import threading
+
+import pandas as pd
+
+try:
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+
+
+def cache_paths(source_path):
+    base, _ = os.path.splitext(source_path)
+    return base + ".feather", base + ".feather.meta.json"
+
+
+def file_sha256(*paths):
+    """Hex SHA-256 over the contents of one or more files, read in 1 MB blocks."""
+    h = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    return h.hexdigest()
+
+
+def _source_stamp(path):
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _replace_atomically(path, write):
+    """
+    write(tmp_path) to a temp file next to path that is unique per process
+    and thread, then rename it over path, so concurrent builders never write
+    into each other's file.
+    """
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _write_meta(meta_path, meta):
+    def write(tmp):
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+
+    _replace_atomically(meta_path, write)
+
+
+def is_fresh(source_path):
+    """True if the columnar cache matches the current workbook."""
+    cache_path, meta_path = cache_paths(source_path)
+    meta = _read_meta(meta_path)
+    if meta is None or not os.path.exists(cache_path):
+        return False
+    stamp = _source_stamp(source_path)
+    if meta.get("size") == stamp["size"] and meta.get("mtime_ns") == stamp["mtime_ns"]:
+        return True
+    # Touched but maybe not changed: fall back to the content hash
+    if meta.get("sha256") == file_sha256(source_path):
+        _write_meta(meta_path, {**meta, **stamp})
+        return True
+    return False
+
+
+def build_cache(source_path):
+    """Convert the workbook to Feather. Returns the parsed DataFrame."""
+    df = pd.read_excel(source_path)
+    if feather is None:
+        return df
+    cache_path, meta_path = cache_paths(source_path)
+    # Uncompressed so the file can be memory-mapped without decoding
+    _replace_atomically(cache_path, lambda tmp: feather.write_feather(df, tmp, compression="uncompressed"))
+    _write_meta(meta_path, {**_source_stamp(source_path), "sha256": file_sha256(source_path)})
+    return df
+
+
+def load_dataset(source_path):
+    """
+    Load the dataset, preferring the memory-mapped Feather cache. Falls back
+    to the workbook (and refreshes the cache) when it is missing or stale,
+    or reads the workbook directly if pyarrow is not installed.
+    """
+    if feather is None:
+        return pd.read_excel(source_path)
+    if is_fresh(source_path):
+        cache_path, _ = cache_paths(source_path)
+        try:
+            return feather.read_table(cache_path, memory_map=True).to_pandas()
+        except Exception as e:
+            print(f"Dataset cache unreadable, rebuilding: {e}")
+    try:
+        return build_cache(source_path)
+    except OSError as e:
+        # Read-only data dir and the like: still serve the workbook
+        print(f"Could not write dataset cache: {e}")
+        return pd.read_excel(source_path)
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join("data", "cyber_threat_dataset.xlsx")
+    if feather is None:
+        sys.exit("pyarrow is required to build the dataset cache.")
+    df = build_cache(path)
+    print(f"Cached {len(df)} rows to {cache_paths(path)[0]}")
@@ -1,11 +1,41 @@
-import pandas as pd
-import random
+"""
+Synthetic threat dataset generator.
+
+Rows are generated in fixed-size chunks across a process pool and streamed
+to disk as they arrive, so millions of rows never sit in memory at once.
+Each chunk has its own seed derived from (--seed, chunk index), so the
+output for a given seed is identical whatever --workers is. Uniqueness of
+threat_text is enforced with a set of 64-bit hashes instead of
+drop_duplicates; rows dropped as duplicates are topped up with extra chunks.
+
+Usage:
+    python generate_dataset.py                                   # 500 rows -> data/cyber_threat_dataset.xlsx
+    python generate_dataset.py --rows 5000000 --workers 8 --out data/alerts.parquet --seed 7
+    python generate_dataset.py --rows 1000000 --format jsonl --out data/alerts.jsonl
+"""
+import argparse
+import hashlib
 import os
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from table_sinks import SINKS
 
 # Constants
 ATTACK_TYPES = ['Phishing', 'Malware', 'DDoS', 'Ransomware', 'SQL Injection']
 SEVERITIES = ['Low', 'Medium', 'High', 'Critical']
 SOURCES = ['Email', 'Firewall', 'IDS', 'SIEM', 'User Report']
+COLUMNS = ['report_id', 'threat_text', 'attack_type', 'severity', 'source']
+FORMATS = {".xlsx": "xlsx", ".csv": "csv", ".parquet": "parquet", ".jsonl": "jsonl"}
+
+DEFAULT_ROWS = 500
+DEFAULT_OUT = os.path.join("data", "cyber_threat_dataset.xlsx")
+# Rows per worker task; also the unit of per-chunk seeding
+CHUNK_ROWS = 50000
+# Excel's sheet limit, minus the header row
+XLSX_MAX_ROWS = 1048575
 
 # Templates for generating realistic threat text
 TEMPLATES = [
@@ -21,64 +51,121 @@ TEMPLATES = [
     "{attack} alert triggered by heuristic analysis engine."
 ]
 
-def generate_threat_text(attack_type, source):
-    ip = f"{random.randint(1,255)}.{random.randint(0,255)}.{random.randint(0,255)}.{random.randint(0,255)}"
-    port = random.randint(1024, 65535)
-    target = f"Server-{random.randint(100,999)}"
-    file = f"update_{random.randint(1000,9999)}.exe"
-    
-    template = random.choice(TEMPLATES)
+def generate_threat_text(attack_type, source, rng=random):
+    ip = f"{rng.randint(1,255)}.{rng.randint(0,255)}.{rng.randint(0,255)}.{rng.randint(0,255)}"
+    port = rng.randint(1024, 65535)
+    target = f"Server-{rng.randint(100,999)}"
+    file = f"update_{rng.randint(1000,9999)}.exe"
+
+    template = rng.choice(TEMPLATES)
     return template.format(attack=attack_type, ip=ip, port=port, target=target, file=file, source=source)
 
-def generate_dataset():
-    data = []
-    
-    # Ensure some balance, but add randomness
-    for i in range(500):
-        attack_type = random.choice(ATTACK_TYPES)
-        severity = random.choice(SEVERITIES)
-        source = random.choice(SOURCES)
-        
+def text_hash(text):
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+def generate_chunk(seed, chunk_index, count, always_noise=False):
+    """
+    Worker task: `count` (threat_text, attack_type, severity, source) rows,
+    unique within the chunk, and their text hashes. Seeded from
+    (seed, chunk_index) only.
+    """
+    rng = random.Random(f"{seed}:{chunk_index}")
+    seen = set()
+    rows, hashes = [], []
+    while len(rows) < count:
+        attack_type = rng.choice(ATTACK_TYPES)
+        severity = rng.choice(SEVERITIES)
+        source = rng.choice(SOURCES)
+
         # Correlate severity slightly with attack type for realism
-        if attack_type in ['Ransomware', 'DDoS'] and random.random() > 0.3:
+        if attack_type in ['Ransomware', 'DDoS'] and rng.random() > 0.3:
             severity = 'Critical'
-        if attack_type == 'Phishing' and random.random() > 0.7:
+        if attack_type == 'Phishing' and rng.random() > 0.7:
             severity = 'Medium'
-            
-        threat_text = generate_threat_text(attack_type, source)
-        
-        row = {
-            'report_id': f"RPT-{10000+i}",
-            'threat_text': threat_text,
-            'attack_type': attack_type,
-            'severity': severity,
-            'source': source
-        }
-        data.append(row)
-    
-    df = pd.DataFrame(data)
-    
-    # Ensure uniqueness
-    df.drop_duplicates(subset=['threat_text'], inplace=True)
-    
-    # Fill up if dropped
-    while len(df) < 500:
-        attack_type = random.choice(ATTACK_TYPES)
-        row = {
-            'report_id': f"RPT-{10000+len(df)}",
-            'threat_text': generate_threat_text(attack_type, random.choice(SOURCES)) + f" ({random.randint(1,100)})", # Add noise to ensure uniqueness
-            'attack_type': attack_type,
-            'severity': random.choice(SEVERITIES),
-            'source': random.choice(SOURCES)
-        }
-        df = pd.concat([df, pd.DataFrame([row])], ignore_index=True)
-        
-    df = df.head(500) # strict 500
-    
-    output_path = os.path.join("data", "cyber_threat_dataset.xlsx")
-    os.makedirs("data", exist_ok=True)
-    df.to_excel(output_path, index=False)
-    print(f"Dataset generated successfully at {output_path} with {len(df)} rows.")
+
+        threat_text = generate_threat_text(attack_type, source, rng)
+        h = text_hash(threat_text)
+        if always_noise or h in seen:
+            # Several templates only vary by attack/source; add noise to ensure uniqueness
+            threat_text = f"{threat_text} ({rng.randint(1, 10**9)})"
+            h = text_hash(threat_text)
+            if h in seen:
+                continue
+        seen.add(h)
+        rows.append((threat_text, attack_type, severity, source))
+        hashes.append(h)
+    return rows, hashes
+
+def _drain(chunk, sink, seen, rows, written, dropped):
+    """Write one chunk's globally unique rows; returns the updated (written, dropped)."""
+    batch = []
+    for (threat_text, attack_type, severity, source), h in zip(*chunk):
+        if h in seen:
+            dropped += 1
+            continue
+        seen.add(h)
+        batch.append((f"RPT-{10000 + written + len(batch)}", threat_text, attack_type, severity, source))
+    batch = batch[:rows - written]
+    sink.write(batch)
+    return written + len(batch), dropped
+
+def generate_dataset(rows=DEFAULT_ROWS, out=DEFAULT_OUT, fmt=None, seed=None, workers=1, chunk_rows=CHUNK_ROWS):
+    fmt = fmt or FORMATS.get(os.path.splitext(out)[1].lower(), "xlsx")
+    if fmt == "xlsx" and rows > XLSX_MAX_ROWS:
+        raise SystemExit(f"xlsx holds at most {XLSX_MAX_ROWS} rows; use --format csv/parquet/jsonl.")
+    if seed is None:
+        seed = random.randrange(2**32)
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+
+    seen = set()
+    written = 0
+    dropped = 0
+    next_chunk = 0
+    t0 = time.perf_counter()
+    tmp = out + ".tmp"
+    sink = SINKS[fmt](tmp, COLUMNS)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            first_pass = True
+            while written < rows:
+                # First pass covers the requested rows; later passes top up
+                # what cross-chunk duplicates removed, with noise on every row
+                deficit = rows - written
+                tasks = [
+                    (next_chunk + n, min(chunk_rows, deficit - start))
+                    for n, start in enumerate(range(0, deficit, chunk_rows))
+                ]
+                next_chunk += len(tasks)
+                # A bounded window of chunks in flight keeps memory flat
+                # when the writer is slower than the workers
+                pending = deque()
+                for index, size in tasks:
+                    pending.append(pool.submit(generate_chunk, seed, index, size, not first_pass))
+                    if len(pending) >= workers * 2:
+                        written, dropped = _drain(pending.popleft().result(), sink, seen, rows, written, dropped)
+                while pending:
+                    written, dropped = _drain(pending.popleft().result(), sink, seen, rows, written, dropped)
+                first_pass = False
+        sink.close()
+        os.replace(tmp, out)
+    except BaseException:
+        sink.close()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+    elapsed = time.perf_counter() - t0
+    print(f"Dataset generated successfully at {out} with {written} rows "
+          f"({fmt}, seed {seed}, {workers} workers, {dropped} duplicates replaced, "
+          f"{written / max(elapsed, 1e-9):.0f} rows/s).")
 
 if __name__ == "__main__":
-    generate_dataset()
+    parser = argparse.ArgumentParser(description="Generate a synthetic cyber threat dataset")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS)
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    parser.add_argument("--format", choices=sorted(SINKS), help="defaults to the --out extension")
+    parser.add_argument("--seed", type=int, help="same seed, same rows, for any worker count (default: random, printed)")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+    generate_dataset(args.rows, args.out, args.format, args.seed, args.workers, args.chunk_rows)
@@ -1,14 +1,25 @@
+import argparse
 import pandas as pd
-import pickle
 import os
+import sys
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, classification_report
 
-def train_model():
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Registry, flat forest export, hashing features and model search live with the backend
+sys.path.append(os.path.abspath(os.path.join(MODEL_DIR, '..', 'web_app', 'backend')))
+from model_store import compile_forest, export_shared, parity_error
+from analysis import file_digest
+from features import HashingFeatures, DEFAULT_N_FEATURES
+from model_search import run_search
+import registry
+
+def train_model(features="tfidf", n_features=DEFAULT_N_FEATURES, select=False, workers=None, folds=5):
     # Load dataset
-    data_path = os.path.join("..", "data", "cyber_threat_dataset.xlsx")
+    data_path = os.path.join(MODEL_DIR, "..", "data", "cyber_threat_dataset.xlsx")
     if not os.path.exists(data_path):
         print(f"Error: Dataset not found at {data_path}")
         return
@@ -19,9 +30,20 @@ def train_model():
     X = df['threat_text']
     y = df['attack_type']
 
+    if select:
+        # Model selection only: compare configurations, save no artifacts
+        run_search(X.astype(str), y.astype(str), os.path.join(MODEL_DIR, "leaderboard.csv"),
+                   workers=workers, folds=folds)
+        return
+
     # Vectorization
-    print("Vectorizing text...")
-    vectorizer = TfidfVectorizer(stop_words='english', max_features=1000)
+    print(f"Vectorizing text ({features})...")
+    if features == "hashing":
+        vectorizer = HashingFeatures(n_features=n_features)
+        feature_config = {"class": "HashingFeatures", "n_features": n_features, "use_idf": True}
+    else:
+        vectorizer = TfidfVectorizer(stop_words='english', max_features=1000)
+        feature_config = {"class": "TfidfVectorizer", "stop_words": "english", "max_features": 1000}
     X_tfidf = vectorizer.fit_transform(X)
 
     # Split
@@ -38,18 +60,42 @@ def train_model():
     print(f"Model Training Complete. Accuracy: {acc:.2f}")
     print(classification_report(y_test, y_pred))
 
-    # Save Artifacts
-    if not os.path.exists("."):
-        os.makedirs(".")
-        
-    print("Saving model artifacts...")
-    with open("model.pkl", "wb") as f:
-        pickle.dump(model, f)
-    
-    with open("vectorizer.pkl", "wb") as f:
-        pickle.dump(vectorizer, f)
-        
-    print("Artifacts saved: model.pkl, vectorizer.pkl")
+    # Publish a new registry version (model/vN/) and make it current
+    print("Publishing model artifacts...")
+    entry = registry.publish(
+        model, vectorizer,
+        metrics={
+            "accuracy": round(float(acc), 4),
+            "n_test": int(X_test.shape[0]),
+            "report": classification_report(y_test, y_pred, output_dict=True),
+        },
+        features={**feature_config, "n_features_out": int(X_tfidf.shape[1])},
+        training={
+            "script": "model/train_model.py",
+            "dataset_sha256": file_digest(data_path),
+            "n_train": int(X_train.shape[0]),
+            "classifier": {"n_estimators": 100, "random_state": 42},
+        },
+    )
+    print(f"Artifacts saved: {entry.path} (now CURRENT)")
+
+    # Flat array export for low-latency scoring (see model_store.py)
+    print("Exporting flat forest...")
+    err = parity_error(model, compile_forest(model), X_test)
+    if err > 1e-9:
+        print(f"Flat forest disagrees with sklearn (max diff {err:.2e}); not exported.")
+        return
+    export_shared(model, vectorizer, entry.artifact("shared"), source_version=entry.version)
+    print(f"Flat forest saved: {entry.artifact('shared')} (max diff vs sklearn {err:.1e})")
 
 if __name__ == "__main__":
-    train_model()
+    parser = argparse.ArgumentParser(description="Train the ThreatNet classifier")
+    parser.add_argument("--features", choices=["tfidf", "hashing"], default="tfidf",
+                        help="hashing: stateless HashingFeatures with IDF weights (features.py)")
+    parser.add_argument("--n-features", type=int, default=DEFAULT_N_FEATURES, help="hash buckets for --features hashing")
+    parser.add_argument("--select", action="store_true",
+                        help="cross-validate a grid of configurations in parallel and write leaderboard.csv")
+    parser.add_argument("--workers", type=int, help="processes for --select (default: all cores)")
+    parser.add_argument("--folds", type=int, default=5, help="CV folds for --select")
+    args = parser.parse_args()
+    train_model(args.features, args.n_features, args.select, args.workers, args.folds)
@@ -1,7 +1,11 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 import os
+import sys
+
+# Add parent dir to path to import dataset_cache
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from dataset_cache import load_dataset
 
 st.set_page_config(page_title="THREATNET Dashboard", layout="wide")
 
@@ -19,7 +23,7 @@ if not os.path.exists(data_path):
     st.error("Dataset not found! Please run data generation script.")
     st.stop()
     
-df = pd.read_excel(data_path)
+df = load_dataset(data_path)
 
 # KPIs
 total_threats = len(df)
@@ -1,5 +1,4 @@
 import streamlit as st
-import pickle
 import os
 import networkx as nx
 import sys
@@ -9,6 +8,9 @@ from datetime import datetime
 # Add parent dir to path to import graph
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from graph import generate_attack_graph, plot_graph
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'web_app', 'backend')))
+from model_store import compile_forest
+import registry
 from fpdf import FPDF
 
 st.set_page_config(page_title="THREATNET Threat Analyzer", layout="wide", page_icon="🛡️")
@@ -70,17 +72,14 @@ MITIGATIONS = {
 # --- LOAD MODEL ---
 @st.cache_resource
 def load_model():
-    model_path = os.path.join("model", "model.pkl")
-    vec_path = os.path.join("model", "vectorizer.pkl")
-    
-    if not os.path.exists(model_path) or not os.path.exists(vec_path):
+    # Current registry version (model/CURRENT or MODEL_VERSION), checksum-verified before unpickling
+    try:
+        model, vectorizer = registry.load(registry.resolve())
+    except registry.RegistryError as e:
+        print(f"Model not loaded: {e}")
         return None, None
-        
-    with open(model_path, "rb") as f:
-        model = pickle.load(f)
-    with open(vec_path, "rb") as f:
-        vectorizer = pickle.load(f)
-    return model, vectorizer
+    # Flat array forest: same probabilities, far less per-call overhead
+    return compile_forest(model), vectorizer
 
 model, vectorizer = load_model()
 
@@ -159,8 +158,8 @@ if analyze_btn and user_input:
     else:
         # PREDICITON
         vec_text = vectorizer.transform([user_input])
-        prediction = model.predict(vec_text)[0]
         probs = model.predict_proba(vec_text)[0]
+        prediction = model.classes_[probs.argmax()]
         confidence = max(probs)
         
         # Get Mitigation Info
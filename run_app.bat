@@ -11,7 +11,7 @@ if not exist "data\cyber_threat_dataset.xlsx" (
     python generate_dataset.py
 )
 
-if not exist "model\model.pkl" (
+if not exist "model\CURRENT" (
     echo [!] Model artifacts not found. Training...
     cd model
     python train_model.py
@@ -0,0 +1,80 @@
+"""
+Streaming table writers shared by generate_dataset.py and the offline
+scanner (web_app/backend/scan.py).
+
+Every sink is opened with the output path and its column names, takes rows
+as sequences in column order via write(rows), and must be closed. Rows go
+to disk batch by batch, so output size never bounds memory.
+"""
+import csv
+import json
+
+
+class CsvSink:
+    def __init__(self, path, columns):
+        self._f = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._f)
+        self._writer.writerow(columns)
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._f.close()
+
+
+class JsonlSink:
+    def __init__(self, path, columns):
+        self._f = open(path, "w", encoding="utf-8")
+        self._columns = list(columns)
+
+    def write(self, rows):
+        self._f.writelines(json.dumps(dict(zip(self._columns, row))) + "\n" for row in rows)
+
+    def close(self):
+        self._f.close()
+
+
+class ParquetSink:
+    """types maps column -> pyarrow type alias ("int64", "float64", ...); default string."""
+
+    def __init__(self, path, columns, types=None):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._pa = pa
+        types = types or {}
+        self._schema = pa.schema([
+            (name, pa.type_for_alias(types.get(name, "string"))) for name in columns
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, rows):
+        if not rows:
+            return
+        self._writer.write_table(self._pa.Table.from_arrays(
+            [self._pa.array(col, type=field.type) for col, field in zip(zip(*rows), self._schema)],
+            schema=self._schema,
+        ))
+
+    def close(self):
+        self._writer.close()
+
+
+class XlsxSink:
+    def __init__(self, path, columns):
+        from openpyxl import Workbook
+        self._path = path
+        # write_only streams rows out instead of building the sheet in memory
+        self._wb = Workbook(write_only=True)
+        self._ws = self._wb.create_sheet()
+        self._ws.append(list(columns))
+
+    def write(self, rows):
+        for row in rows:
+            self._ws.append(row)
+
+    def close(self):
+        self._wb.save(self._path)
+
+
+SINKS = {"csv": CsvSink, "jsonl": JsonlSink, "parquet": ParquetSink, "xlsx": XlsxSink}
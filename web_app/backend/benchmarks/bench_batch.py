@@ -0,0 +1,59 @@
+"""
+Benchmark: /analyze/batch vs looping over the single-text path.
+
+Compares, in-process, N calls of the per-request dataset + ML stages against
+one run_local_batch call over the same N texts.
+
+Run from web_app/backend:
+    python benchmarks/bench_batch.py --sizes 100 1000 5000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import main
+
+TEXTS = [
+    "URGENT: your account is suspended, click here to verify account details now!",
+    "Hi team, just checking in about the meeting tomorrow at 10am.",
+    "Send 0.5 BTC to this wallet to decrypt your locked files.",
+    "Firewall blocked potential DDoS packet flood on port 8080.",
+    "' OR 1=1; DROP TABLE users; --",
+]
+
+
+def single_loop(texts, res):
+    return [(main.run_dataset_stage(t.lower(), res), main.run_ml_stage(t, res)) for t in texts]
+
+
+def run():
+    parser = argparse.ArgumentParser(description="Batch vs single analysis benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    args = parser.parse_args()
+
+    res = main.load_resources()
+    if not (res.model and res.vectorizer):
+        sys.exit("Model artifacts not loaded; run from web_app/backend.")
+
+    rng = random.Random(0)
+    print(f"{'texts':>7} {'single loop (s)':>16} {'batch (s)':>10} {'speedup':>8}")
+    for n in args.sizes:
+        texts = [f"{rng.choice(TEXTS)} ref {i}" for i in range(n)]
+
+        t0 = time.perf_counter()
+        single = single_loop(texts, res)
+        single_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        batch = main.run_local_batch(texts, res)
+        batch_s = time.perf_counter() - t0
+
+        assert [s[1]["prediction"] for s in single] == [b["ml_result"]["prediction"] for b in batch]
+        print(f"{n:>7} {single_s:>16.2f} {batch_s:>10.2f} {single_s / batch_s:>7.1f}x")
+
+
+if __name__ == "__main__":
+    run()
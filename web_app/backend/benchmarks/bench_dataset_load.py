@@ -0,0 +1,59 @@
+"""
+Benchmark: dataset load at startup, Excel vs the Feather cache.
+
+Times pd.read_excel against dataset_cache.load_dataset (memory-mapped
+Feather) for the shipped workbook and for larger synthetic workbooks.
+
+Run from web_app/backend:
+    python benchmarks/bench_dataset_load.py --rows 500 50000
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from analysis import DEFAULT_DATASET_PATH
+from dataset_cache import build_cache, load_dataset
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Excel vs Feather dataset load")
+    parser.add_argument("--rows", type=int, nargs="+", default=[500, 50000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    base = pd.read_excel(DEFAULT_DATASET_PATH)
+    tmpdir = tempfile.mkdtemp()
+    try:
+        print(f"{'rows':>8} {'read_excel (ms)':>16} {'build cache (ms)':>17} {'feather mmap (ms)':>18} {'speedup':>8}")
+        for n in args.rows:
+            path = os.path.join(tmpdir, f"dataset_{n}.xlsx")
+            reps = -(-n // len(base))
+            pd.concat([base] * reps, ignore_index=True).head(n).to_excel(path, index=False)
+
+            excel_ms = best_of(lambda: pd.read_excel(path), args.repeat)
+            t0 = time.perf_counter()
+            build_cache(path)
+            build_ms = (time.perf_counter() - t0) * 1000
+            cached_ms = best_of(lambda: load_dataset(path), args.repeat)
+            print(f"{n:>8} {excel_ms:>16.1f} {build_ms:>17.1f} {cached_ms:>18.1f} {excel_ms / cached_ms:>7.0f}x")
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark: TF-IDF vocabulary pipeline vs stateless HashingFeatures.
+
+Trains the same RandomForest on both feature pipelines (same split as
+model/train_model.py) and reports, side by side: accuracy, vectorizer
+pickle size and load time, single-text latency (transform + flat forest)
+and bulk transform throughput serially and across worker processes.
+
+Run from web_app/backend:
+    python benchmarks/bench_features.py --bulk 100000 --jobs 4
+"""
+import argparse
+import os
+import pickle
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+
+from analysis import DEFAULT_DATASET_PATH, load_signature_dataset
+from features import HashingFeatures, DEFAULT_N_FEATURES
+from model_store import compile_forest
+
+
+def per_call(fn, repeat):
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat
+
+
+def evaluate(name, vectorizer, texts, labels, bulk, jobs, repeat):
+    t0 = time.perf_counter()
+    X = vectorizer.fit_transform(texts)
+    fit_s = time.perf_counter() - t0
+    X_train, X_test, y_train, y_test = train_test_split(X, labels, test_size=0.2, random_state=42)
+    model = RandomForestClassifier(n_estimators=100, random_state=42).fit(X_train, y_train)
+    acc = accuracy_score(y_test, model.predict(X_test))
+
+    blob = pickle.dumps(vectorizer)
+    load_s = per_call(lambda: pickle.loads(blob), repeat)
+
+    forest = compile_forest(model)
+    sample = [texts[0]]
+    single_s = per_call(lambda: forest.predict_proba(vectorizer.transform(sample)), repeat)
+
+    t0 = time.perf_counter()
+    vectorizer.transform(bulk)
+    serial = len(bulk) / (time.perf_counter() - t0)
+    parallel = None
+    if isinstance(vectorizer, HashingFeatures):
+        t0 = time.perf_counter()
+        vectorizer.transform(bulk, n_jobs=jobs)
+        parallel = len(bulk) / (time.perf_counter() - t0)
+
+    return {
+        "pipeline": name, "accuracy": acc, "fit_s": fit_s, "pickle_kb": len(blob) / 1024,
+        "load_ms": load_s * 1e3, "single_ms": single_s * 1e3,
+        "serial_rps": serial, "parallel_rps": parallel,
+    }
+
+
+def run():
+    parser = argparse.ArgumentParser(description="TF-IDF vs hashing feature pipeline")
+    parser.add_argument("--bulk", type=int, default=100000, help="texts for the throughput test")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--n-features", type=int, default=DEFAULT_N_FEATURES)
+    args = parser.parse_args()
+
+    df, _ = load_signature_dataset(DEFAULT_DATASET_PATH)
+    texts = df["threat_text"].astype(str).tolist()
+    labels = df["attack_type"]
+    bulk = [f"{texts[i % len(texts)]} ref {i}" for i in range(args.bulk)]
+
+    # Streaming IDF must match a single fit over the same documents
+    streamed = HashingFeatures(n_features=args.n_features)
+    for i in range(0, len(texts), 64):
+        streamed.partial_fit(texts[i:i + 64])
+    whole = HashingFeatures(n_features=args.n_features).fit(texts)
+    print(f"partial_fit IDF matches fit: {np.allclose(streamed.idf_, whole.idf_)}")
+
+    rows = [
+        evaluate("tfidf (vocab)", TfidfVectorizer(stop_words="english", max_features=1000),
+                 texts, labels, bulk, args.jobs, args.repeat),
+        evaluate(f"hashing 2^{int(np.log2(args.n_features))}", HashingFeatures(n_features=args.n_features),
+                 texts, labels, bulk, args.jobs, args.repeat),
+    ]
+
+    print(f"{'pipeline':>14} {'acc':>6} {'fit (s)':>8} {'pickle KB':>10} {'load (ms)':>10} "
+          f"{'1 text (ms)':>12} {'texts/s':>9} {f'x{args.jobs} texts/s':>14}")
+    for r in rows:
+        parallel = f"{r['parallel_rps']:.0f}" if r["parallel_rps"] else "n/a"
+        print(f"{r['pipeline']:>14} {r['accuracy']:>6.3f} {r['fit_s']:>8.3f} {r['pickle_kb']:>10.1f} "
+              f"{r['load_ms']:>10.3f} {r['single_ms']:>12.3f} {r['serial_rps']:>9.0f} {parallel:>14}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,95 @@
+"""
+Microbenchmark: flat all-trees predictor (model_store.py) vs sklearn.
+
+Checks probability parity of FlatForest (compiled in process) and
+SharedForest (exported and memory-mapped) against sklearn on the signature
+dataset, then times predict_proba for single rows and for batches. With
+--check it stops after the parity checks and exits non-zero on a mismatch,
+as a regression gate for changes to model_store.py.
+
+Run from web_app/backend:
+    python benchmarks/bench_forest.py --repeat 200 --batch-sizes 1 16 64 128 256 4096
+    python benchmarks/bench_forest.py --check
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import scipy.sparse as sp
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from analysis import DEFAULT_DATASET_PATH, load_signature_dataset
+from model_store import compile_forest, export_shared, load_shared, parity_error
+import registry
+
+
+def time_call(fn, X, repeat):
+    fn(X)
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(X)
+    return (time.perf_counter() - t0) / repeat
+
+
+def check_parity(model, vectorizer, X_all):
+    """Print one line per predictor; returns False if any differs from sklearn."""
+    # Dataset rows twice over plus random sparse rows: more than one
+    # PREDICT_CHUNK_ROWS chunk, and splits the real texts never reach
+    X_rand = sp.random(600, X_all.shape[1], density=0.05, format="csr", random_state=0)
+    X = sp.vstack([X_all, X_all, X_rand]).tocsr()
+    with tempfile.TemporaryDirectory() as tmp:
+        export_shared(model, vectorizer, os.path.join(tmp, "shared"))
+        shared, _ = load_shared(os.path.join(tmp, "shared"))
+        predictors = [
+            ("FlatForest", compile_forest(model, keep_fallback=False)),
+            ("SharedForest", shared),
+        ]
+        ok = True
+        for name, forest in predictors:
+            err = parity_error(model, forest, X)
+            same = bool((model.predict(X) == forest.predict(X)).all())
+            print(f"{name:<20} {X.shape[0]} rows: max |diff| {err:.1e}, identical labels: {same}")
+            ok = ok and err <= 1e-9 and same
+        # Release the mapped files before the temp dir goes away
+        del shared, predictors
+    return ok
+
+
+def run():
+    parser = argparse.ArgumentParser(description="Flat forest vs sklearn predict_proba")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16, 64, 128, 256, 4096])
+    parser.add_argument("--model-version", help="registry version (default: current)")
+    parser.add_argument("--check", action="store_true", help="parity checks only; exit 1 on a mismatch")
+    args = parser.parse_args()
+
+    model, vectorizer = registry.load(registry.resolve(args.model_version))
+    df, _ = load_signature_dataset(DEFAULT_DATASET_PATH)
+    X_all = vectorizer.transform(df["threat_text"].astype(str).tolist())
+
+    t0 = time.perf_counter()
+    # No sklearn fallback here: time the flat walk itself at every batch size
+    forest = compile_forest(model, keep_fallback=False)
+    print(f"Compiled {len(forest.roots)} trees, {len(forest.feature)} nodes "
+          f"in {(time.perf_counter() - t0) * 1e3:.1f} ms")
+
+    if not check_parity(model, vectorizer, X_all):
+        sys.exit("Parity check failed.")
+    if args.check:
+        return
+
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>6} {'sklearn (ms)':>13} {'flat (ms)':>10} {'speedup':>8}")
+    for n in args.batch_sizes:
+        X = X_all[rng.integers(0, X_all.shape[0], size=n)]
+        repeat = max(3, args.repeat // max(1, n // 16))
+        sk = time_call(model.predict_proba, X, repeat)
+        flat = time_call(forest.predict_proba, X, repeat)
+        print(f"{n:>6} {sk * 1e3:>13.3f} {flat * 1e3:>10.3f} {sk / flat:>7.1f}x")
+
+
+if __name__ == "__main__":
+    run()
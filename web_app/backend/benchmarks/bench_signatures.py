@@ -0,0 +1,107 @@
+"""
+Benchmark: dataset signature lookup in /analyze.
+
+Compares the old per-row `iterrows()` substring scan with the compiled
+SignatureIndex at several signature-set sizes.
+
+Run from web_app/backend:
+    python benchmarks/bench_signatures.py
+    python benchmarks/bench_signatures.py --sizes 500 50000 1000000 --legacy-max 50000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from signatures import SignatureIndex
+
+ATTACK_TYPES = ['Phishing', 'Malware', 'DDoS', 'Ransomware', 'SQL Injection']
+TEMPLATES = [
+    "detected suspicious {attack} activity originating from ip {ip}. target system: server-{n}.",
+    "firewall blocked potential {attack} packet flood on port {port}.",
+    "system scan revealed {attack} payload in file 'update_{n}.exe'.",
+    "compromised credential usage linked to known {attack} campaign {n}-{port}.",
+]
+
+SAMPLE_INPUTS = [
+    "Hi team, just checking in about the meeting tomorrow at 10am.",
+    "URGENT: your account is suspended, click here to verify account details now!",
+    "Please find attached the quarterly report. " * 20,
+]
+
+
+def make_signatures(n, seed=42):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        atype = rng.choice(ATTACK_TYPES)
+        text = rng.choice(TEMPLATES).format(
+            attack=atype.lower(),
+            ip=".".join(str(rng.randint(0, 255)) for _ in range(4)),
+            port=rng.randint(1024, 65535),
+            n=i,
+        )
+        rows.append({"report_id": f"RPT-{10000 + i}", "threat_text": text, "attack_type": atype})
+    return pd.DataFrame(rows)
+
+
+def legacy_scan(df, input_lower):
+    for _, row in df.iterrows():
+        threat_txt = str(row['threat_text']).lower()
+        if len(threat_txt) > 4 and threat_txt in input_lower:
+            return row.get('report_id')
+    return None
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct))]
+
+
+def time_calls(fn, inputs, repeat):
+    samples = []
+    for _ in range(repeat):
+        for text in inputs:
+            t0 = time.perf_counter()
+            fn(text)
+            samples.append((time.perf_counter() - t0) * 1000)
+    return percentile(samples, 0.5), percentile(samples, 0.99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 50000, 1000000])
+    parser.add_argument("--legacy-max", type=int, default=50000,
+                        help="skip the iterrows baseline above this many signatures")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'signatures':>12} {'build(s)':>9} {'index p50(ms)':>14} {'index p99(ms)':>14} "
+          f"{'iterrows p50(ms)':>17} {'iterrows p99(ms)':>17}")
+    for n in args.sizes:
+        df = make_signatures(n)
+        # Include one real signature so the hit path is exercised too
+        inputs = SAMPLE_INPUTS + [f"fwd: {df['threat_text'].iloc[n // 2]} please review"]
+
+        t0 = time.perf_counter()
+        index = SignatureIndex.from_dataframe(df)
+        build_s = time.perf_counter() - t0
+        idx_p50, idx_p99 = time_calls(lambda t: index.match(t.lower()), inputs, args.repeat)
+
+        if n <= args.legacy_max:
+            legacy_repeat = max(1, args.repeat // 10)
+            leg_p50, leg_p99 = time_calls(lambda t: legacy_scan(df, t.lower()), inputs, legacy_repeat)
+            legacy = f"{leg_p50:>17.2f} {leg_p99:>17.2f}"
+        else:
+            legacy = f"{'skipped':>17} {'skipped':>17}"
+
+        print(f"{n:>12} {build_s:>9.2f} {idx_p50:>14.3f} {idx_p99:>14.3f} {legacy}")
+    print(f"\nbackend: {index.backend}")
+
+
+if __name__ == "__main__":
+    main()
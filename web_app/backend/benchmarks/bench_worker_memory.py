@@ -0,0 +1,145 @@
+"""
+Benchmark: per-worker memory with pickled vs shared (memory-mapped) models.
+
+Starts `uvicorn main:app --workers N` once per serving mode, waits for the
+workers to load, and reports each worker's RSS and PSS. PSS splits shared
+pages between the processes mapping them, so it shows what the shared
+export actually saves; RSS counts shared pages in every worker.
+
+Run from web_app/backend (Linux, reads /proc):
+    python benchmarks/bench_worker_memory.py --workers 4
+    python benchmarks/bench_worker_memory.py --workers 4 --synthetic-rows 10000 --synthetic-trees 100
+
+The shipped model is ~1 MB, too small to show a difference next to the
+interpreter and libraries; --synthetic-* trains a large forest on random
+labels (deep trees) into a temp dir to make the effect visible.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import numpy as np
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND_DIR)
+import registry
+
+PORT = 8910
+
+
+def proc_children(pid):
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            if int(fields[1]) == pid:
+                children.append(int(entry))
+        except OSError:
+            pass
+    return children
+
+
+def memory_mb(pid):
+    rss = pss = 0
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Rss:"):
+                rss = int(line.split()[1]) / 1024
+            elif line.startswith("Pss:"):
+                pss = int(line.split()[1]) / 1024
+    return rss, pss
+
+
+def build_synthetic_model(rows, trees, vectorizer_dir, out_dir):
+    import pickle
+    import scipy.sparse as sp
+    from sklearn.ensemble import RandomForestClassifier
+
+    with open(os.path.join(vectorizer_dir, "vectorizer.pkl"), "rb") as f:
+        vectorizer = pickle.load(f)
+    n_features = len(vectorizer.vocabulary_)
+    rng = np.random.default_rng(0)
+    X = sp.random(rows, n_features, density=0.02, format="csr", random_state=0, dtype=np.float64)
+    y = rng.choice(['DDoS', 'Malware', 'Phishing', 'Ransomware', 'SQL Injection'], size=rows)
+    model = RandomForestClassifier(n_estimators=trees, random_state=0, n_jobs=-1).fit(X, y)
+    with open(os.path.join(out_dir, "model.pkl"), "wb") as f:
+        pickle.dump(model, f)
+    with open(os.path.join(out_dir, "vectorizer.pkl"), "wb") as f:
+        pickle.dump(vectorizer, f)
+
+
+def pre_export(model_dir, shared_dir):
+    from analysis import file_digest, load_model_artifacts
+    from model_store import export_shared
+
+    model, vectorizer = load_model_artifacts(model_dir)
+    # main.py tags a MODEL_DIR model with its file digest
+    version = file_digest(os.path.join(model_dir, "model.pkl"), os.path.join(model_dir, "vectorizer.pkl"))
+    export_shared(model, vectorizer, shared_dir, source_version=version)
+
+
+def measure(mode, workers, model_dir, shared_dir):
+    env = dict(os.environ, PYTHONWARNINGS="ignore", MODEL_SERVING=mode, MODEL_DIR=model_dir, SHARED_MODEL_DIR=shared_dir)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(PORT),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL,
+    )
+    try:
+        # Every worker must have loaded; poll readyz until enough 200s in a row
+        deadline = time.time() + 120
+        ok = 0
+        while ok < workers * 4 and time.time() < deadline:
+            try:
+                ok = ok + 1 if httpx.get(f"http://127.0.0.1:{PORT}/readyz").status_code == 200 else 0
+            except httpx.HTTPError:
+                ok = 0
+            time.sleep(0.05)
+        time.sleep(2)
+        # uvicorn's supervisor may spawn a multiprocessing helper; workers are the python children
+        pids = [p for p in proc_children(server.pid) if os.path.exists(f"/proc/{p}/smaps_rollup")]
+        return [memory_mb(p) for p in pids]
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-worker memory: pickle vs shared model")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--model-dir", help="model.pkl/vectorizer.pkl directory (default: current registry version)")
+    parser.add_argument("--synthetic-rows", type=int, default=0)
+    parser.add_argument("--synthetic-trees", type=int, default=100)
+    args = parser.parse_args()
+
+    args.model_dir = args.model_dir or registry.resolve().path
+    if args.synthetic_rows:
+        base_dir, args.model_dir = args.model_dir, tempfile.mkdtemp(prefix="threatnet_model_")
+        build_synthetic_model(args.synthetic_rows, args.synthetic_trees, base_dir, args.model_dir)
+
+    # Export up front, as deployments do (train_model.py), so shared-mode
+    # workers only map it instead of each unpickling the forest first
+    shared_dir = os.path.join(tempfile.mkdtemp(prefix="threatnet_shared_"), "shared")
+    pre_export(args.model_dir, shared_dir)
+    model_mb = os.path.getsize(os.path.join(args.model_dir, "model.pkl")) / 1024 / 1024
+    print(f"model.pkl: {model_mb:.1f} MB, workers: {args.workers}")
+    print(f"{'mode':>8} {'RSS/worker (MB)':>16} {'PSS/worker (MB)':>16} {'PSS total (MB)':>15}")
+    for mode in ("pickle", "shared"):
+        stats = measure(mode, args.workers, os.path.abspath(args.model_dir), shared_dir)
+        if not stats:
+            print(f"{mode:>8}  no workers found")
+            continue
+        rss = sum(s[0] for s in stats) / len(stats)
+        pss = sum(s[1] for s in stats) / len(stats)
+        print(f"{mode:>8} {rss:>16.1f} {pss:>16.1f} {sum(s[1] for s in stats):>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark: time to first token, /chat vs /chat/stream.
+
+Starts the Groq stub (streaming-capable) and the backend in-process, sends
+the same chat message to both endpoints and reports when the first text
+reached the client and when the reply was complete. Then opens a stream,
+drops it after the first token, and checks that the stub saw the upstream
+stream cancelled.
+
+Run from web_app/backend:
+    python benchmarks/chat_ttft.py --requests 20 --delay 0.3 --token-delay 0.03
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+from groq_stub import make_stub_app, serve_in_thread
+from load_analyze import APP_PORT, STUB_PORT, start_backend
+
+MESSAGE = {"message": "How do I spot a phishing email?", "history": []}
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] * 1000
+
+
+async def time_chat(client):
+    t0 = time.perf_counter()
+    resp = await client.post("/chat", json=MESSAGE)
+    resp.raise_for_status()
+    total = time.perf_counter() - t0
+    # Nothing is shown until the whole reply arrives
+    return total, total
+
+
+async def time_chat_stream(client):
+    t0 = time.perf_counter()
+    first = None
+    async with client.stream("POST", "/chat/stream", json=MESSAGE) as resp:
+        resp.raise_for_status()
+        async for line in resp.aiter_lines():
+            if first is None and line.startswith("data:") and "token" in json.loads(line[5:]):
+                first = time.perf_counter() - t0
+    return first, time.perf_counter() - t0
+
+
+async def disconnect_check(client, stub):
+    before = stub.state.cancelled_streams
+    async with client.stream("POST", "/chat/stream", json=MESSAGE) as resp:
+        async for line in resp.aiter_lines():
+            if line.startswith("data:"):
+                break  # first token, then hang up
+    deadline = time.time() + 5
+    while stub.state.cancelled_streams == before and time.time() < deadline:
+        await asyncio.sleep(0.05)
+    return stub.state.cancelled_streams > before
+
+
+async def run(requests, stub):
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{APP_PORT}", timeout=60) as client:
+        print(f"{'endpoint':<14} {'TTFT p50 (ms)':>14} {'TTFT p95 (ms)':>14} {'total p50 (ms)':>15}")
+        for name, fn in (("/chat", time_chat), ("/chat/stream", time_chat_stream)):
+            samples = [await fn(client) for _ in range(requests)]
+            ttft = [s[0] for s in samples]
+            total = [s[1] for s in samples]
+            print(f"{name:<14} {percentile(ttft, 0.5):>14.1f} {percentile(ttft, 0.95):>14.1f} "
+                  f"{percentile(total, 0.5):>15.1f}")
+        cancelled = await disconnect_check(client, stub)
+        print(f"client disconnect cancels upstream stream: {'yes' if cancelled else 'NO'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TTFT: /chat vs /chat/stream against a Groq stub")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--delay", type=float, default=0.3, help="stub time to first token (s)")
+    parser.add_argument("--token-delay", type=float, default=0.03, help="stub time between tokens (s)")
+    args = parser.parse_args()
+
+    stub = make_stub_app(args.delay, args.token_delay)
+    serve_in_thread(stub, STUB_PORT)
+    backend = start_backend()
+    asyncio.run(run(args.requests, stub))
+    print("metrics chat_stream_ttft_s:", backend.metrics.summary("chat.stream.ttft"))
+
+
+if __name__ == "__main__":
+    main()
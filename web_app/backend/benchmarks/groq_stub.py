@@ -0,0 +1,144 @@
+"""
+Local stand-in for the Groq chat-completions endpoint, for load tests.
+
+    python benchmarks/groq_stub.py --port 8901 --delay 0.2 --token-delay 0.02
+
+Requests with "stream": true get the reply back as SSE chunks, one word
+every --token-delay seconds after the initial --delay (time to first token).
+
+Faults for resilience tests: --error-rate answers that fraction of calls
+with --error-status, --slow-rate adds --slow-delay seconds to that fraction
+(tail latency), --drop-rate leaves that fraction of entries out of batched
+analysis replies. Faults can be changed at runtime with
+POST /_faults {"error_rate": 1.0} (app.state.faults in-process).
+
+Batched analysis prompts ("### Message <id>" sections) get one result per
+id and take --batch-item-delay longer per extra message, since the model
+writes that much more output.
+
+Point the backend at it with GROQ_API_URL=http://127.0.0.1:8901/openai/v1/chat/completions
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+STUB_REPLY = {
+    "threat_type": "Phishing",
+    "confidence": 0.9,
+    "spam_score": 80,
+    "explanation": "Stubbed response.",
+    "caution": "",
+    "precautions": [],
+    "solution": "",
+    "attack_flow": {"source": "stub", "vulnerability": "stub", "impact": "stub"}
+}
+
+BATCH_ITEM_RE = re.compile(r"### Message (\d+)")
+
+STUB_CHAT_REPLY = (
+    "Great question! Phishing emails usually create urgency, ask you to click "
+    "a link or open an attachment, and come from an address that is almost, "
+    "but not quite, the real one. When in doubt, paste the text into the "
+    "ThreatNet dashboard and I will take a look!"
+)
+
+
+def make_stub_app(delay=0.2, token_delay=0.02, faults=None, seed=0, batch_item_delay=0.02):
+    app = FastAPI()
+    app.state.calls = 0
+    app.state.batch_items = 0
+    app.state.faults = {
+        "error_rate": 0.0, "error_status": 503, "slow_rate": 0.0, "slow_delay": 1.0, "drop_rate": 0.0,
+        **(faults or {}),
+    }
+    app.state.injected = {"errors": 0, "slow": 0}
+    rng = random.Random(seed)
+    # Streams that ended because the client went away mid-reply
+    app.state.cancelled_streams = 0
+
+    async def stream_reply():
+        try:
+            await asyncio.sleep(delay)
+            for i, word in enumerate(STUB_CHAT_REPLY.split(" ")):
+                if i:
+                    await asyncio.sleep(token_delay)
+                chunk = {"choices": [{"index": 0, "delta": {"content": (" " if i else "") + word}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+        except asyncio.CancelledError:
+            app.state.cancelled_streams += 1
+            raise
+
+    @app.post("/_faults")
+    async def set_faults(request: Request):
+        app.state.faults.update(await request.json())
+        return app.state.faults
+
+    @app.post("/openai/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        app.state.calls += 1
+        faults = app.state.faults
+        if rng.random() < faults["error_rate"]:
+            app.state.injected["errors"] += 1
+            await asyncio.sleep(delay / 10)
+            return JSONResponse({"error": {"message": "injected fault"}}, status_code=faults["error_status"])
+        if rng.random() < faults["slow_rate"]:
+            app.state.injected["slow"] += 1
+            await asyncio.sleep(faults["slow_delay"])
+        if body.get("stream"):
+            return StreamingResponse(stream_reply(), media_type="text/event-stream")
+        messages = body.get("messages") or [{}]
+        batch_ids = [int(i) for i in BATCH_ITEM_RE.findall(messages[-1].get("content", ""))]
+        if batch_ids:
+            app.state.batch_items += len(batch_ids)
+            await asyncio.sleep(delay + batch_item_delay * (len(batch_ids) - 1))
+            results = [{"id": i, **STUB_REPLY} for i in batch_ids if rng.random() >= faults["drop_rate"]]
+            return {"choices": [{"message": {"role": "assistant", "content": json.dumps({"results": results})}}]}
+        await asyncio.sleep(delay)
+        content = json.dumps(STUB_REPLY)
+        if messages[0].get("content", "").startswith("You are 'Cute Bot'"):
+            # A non-streamed chat reply takes as long as streaming all of it
+            await asyncio.sleep(token_delay * (len(STUB_CHAT_REPLY.split(" ")) - 1))
+            content = STUB_CHAT_REPLY
+        return {"choices": [{"message": {"role": "assistant", "content": content}}]}
+
+    return app
+
+
+def serve_in_thread(app, port):
+    """Run an ASGI app with uvicorn on a daemon thread and wait until it is up."""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Groq API stub")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--delay", type=float, default=0.2, help="seconds per completion (first token when streaming)")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="seconds between streamed chat tokens")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls that fail")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="fraction of calls that are slow")
+    parser.add_argument("--slow-delay", type=float, default=1.0, help="extra seconds for slow calls")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="fraction of batched results left out")
+    parser.add_argument("--batch-item-delay", type=float, default=0.02, help="extra seconds per message in a batch")
+    args = parser.parse_args()
+    faults = {
+        "error_rate": args.error_rate, "error_status": args.error_status,
+        "slow_rate": args.slow_rate, "slow_delay": args.slow_delay, "drop_rate": args.drop_rate,
+    }
+    app = make_stub_app(args.delay, args.token_delay, faults, batch_item_delay=args.batch_item_delay)
+    uvicorn.run(app, host="127.0.0.1", port=args.port)
@@ -0,0 +1,107 @@
+"""
+Stream a large synthetic upload through /ingest and watch server memory.
+
+Starts the backend with uvicorn in a subprocess, then sends N records with
+chunked transfer encoding while reading verdicts back on the same
+connection (full duplex). Prints throughput and the server's RSS, sampled
+during the upload.
+
+Run from web_app/backend (Linux, reads /proc):
+    python benchmarks/ingest_upload.py --records 200000
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+PORT = 8905
+LINE = b'{"text": "Send BTC to this wallet to decrypt your locked files, click here now. ' + b'x' * 300 + b'"}\n'
+
+
+def rss_mb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def upload(records, chunk_lines, pid):
+    reader, writer = await asyncio.open_connection("127.0.0.1", PORT)
+    writer.write(
+        b"POST /ingest HTTP/1.1\r\nHost: localhost\r\n"
+        b"Content-Type: application/x-ndjson\r\nTransfer-Encoding: chunked\r\n\r\n"
+    )
+    samples = []
+
+    async def send():
+        chunk = LINE * chunk_lines
+        sent = 0
+        while sent < records:
+            n = min(chunk_lines, records - sent)
+            body = chunk if n == chunk_lines else LINE * n
+            writer.write(b"%x\r\n%s\r\n" % (len(body), body))
+            await writer.drain()  # blocks when the server stops reading
+            sent += n
+            if sent % (chunk_lines * 50) == 0:
+                samples.append(rss_mb(pid))
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def receive():
+        verdicts = 0
+        summary = b""
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if b'"line"' in line:
+                verdicts += 1
+            elif b'"summary"' in line:
+                summary = line
+                break
+        return verdicts, summary
+
+    t0 = time.perf_counter()
+    _, (verdicts, summary) = await asyncio.gather(send(), receive())
+    elapsed = time.perf_counter() - t0
+    writer.close()
+    return verdicts, elapsed, samples, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a large upload through /ingest")
+    parser.add_argument("--records", type=int, default=200000)
+    parser.add_argument("--chunk-lines", type=int, default=100)
+    args = parser.parse_args()
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(PORT), "--log-level", "warning"],
+        cwd=os.path.abspath(os.path.join(os.path.dirname(__file__), "..")),
+    )
+    try:
+        # Wait until resources have loaded, or verdicts would be partial
+        for _ in range(600):
+            try:
+                if httpx.get(f"http://127.0.0.1:{PORT}/readyz").status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.1)
+        idle = rss_mb(server.pid)
+        verdicts, elapsed, samples, summary = asyncio.run(upload(args.records, args.chunk_lines, server.pid))
+        upload_mb = len(LINE) * args.records / 1024 / 1024
+        print(f"uploaded {upload_mb:.0f} MB, {verdicts} verdicts in {elapsed:.1f}s ({verdicts / elapsed:.0f} records/s)")
+        print(f"server RSS: idle {idle:.0f} MB, during upload max {max(samples or [idle]):.0f} MB")
+        print(summary.decode().strip())
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: /analyze with Groq micro-batching at different batch windows.
+
+Starts the Groq stub and the backend in-process (result cache off, so every
+request needs an AI verdict) and drives /analyze with closed-loop clients
+for each batch window. Reports requests per upstream Groq call, throughput
+and latency percentiles; window 0 is the unbatched baseline. The last run
+drops a share of entries from batched replies to exercise the per-item
+fallback.
+
+Run from web_app/backend:
+    python benchmarks/llm_batching.py --clients 4,32 --requests 400 --windows 0,2,10,25,50
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+from groq_stub import make_stub_app, serve_in_thread
+from load_analyze import APP_PORT, STUB_PORT, TEXTS, start_backend
+
+
+async def drive(clients, total):
+    latencies = []
+    ai_ok = 0
+    counter = iter(range(total))
+
+    async def worker(client):
+        nonlocal ai_ok
+        for i in counter:
+            payload = {"text": f"{TEXTS[i % len(TEXTS)]} #{time.time_ns()}-{i}", "message_type": "email"}
+            t0 = time.perf_counter()
+            resp = await client.post("/analyze", json=payload)
+            latencies.append(time.perf_counter() - t0)
+            if resp.status_code == 200 and resp.json()["ai_result"] is not None:
+                ai_ok += 1
+
+    limits = httpx.Limits(max_connections=clients)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{APP_PORT}", limits=limits, timeout=120) as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(clients)))
+        elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+    return {
+        "ai_rate": ai_ok / total,
+        "rps": total / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/analyze throughput and latency vs Groq batch window")
+    parser.add_argument("--clients", default="4,32", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--windows", default="0,2,10,25,50", help="batch windows in ms (0 = no batching)")
+    parser.add_argument("--max-items", type=int, default=8)
+    parser.add_argument("--delay", type=float, default=0.2, help="stub latency per Groq call (s)")
+    parser.add_argument("--batch-item-delay", type=float, default=0.02, help="stub latency per extra batched message (s)")
+    parser.add_argument("--drop-rate", type=float, default=0.1, help="batched entries dropped in the fallback run")
+    args = parser.parse_args()
+
+    stub = make_stub_app(args.delay, batch_item_delay=args.batch_item_delay)
+    serve_in_thread(stub, STUB_PORT)
+    backend = start_backend({"ANALYZE_CACHE_ENTRIES": "0"})
+    from llm_batcher import LLMBatcher
+
+    runs = [(int(c), float(w), 0.0) for c in args.clients.split(",") for w in args.windows.split(",")]
+    runs.append((int(args.clients.split(",")[-1]), float(args.windows.split(",")[-1]), args.drop_rate))
+    print(f"{'clients':>7} {'window':>7} {'drop':>5} {'req/call':>9} {'AI verdicts':>11} "
+          f"{'req/s':>7} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    for clients, window_ms, drop in runs:
+        backend.llm_batcher = LLMBatcher(backend.llm, window_ms / 1000, args.max_items) if window_ms > 0 else None
+        stub.state.faults["drop_rate"] = drop
+        calls = stub.state.calls
+        stats = asyncio.run(drive(clients, args.requests))
+        per_call = args.requests / max(1, stub.state.calls - calls)
+        print(f"{clients:>7} {window_ms:>5.0f}ms {drop:>5.0%} {per_call:>9.2f} {stats['ai_rate']:>10.0%} "
+              f"{stats['rps']:>7.1f} {stats['p50_ms']:>9.1f} {stats['p99_ms']:>9.1f}")
+    print("counters:", backend.metrics.snapshot("llm.batch"))
+
+
+if __name__ == "__main__":
+    main()
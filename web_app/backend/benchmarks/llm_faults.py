@@ -0,0 +1,100 @@
+"""
+Resilience test: /analyze against a fault-injecting Groq stub.
+
+Starts the stub and the backend in-process (result cache off, every request
+calls the LLM) and runs three scenarios, each with the old call behaviour
+(one attempt, no breaker, no hedging) and with llm_client.py's retries,
+circuit breaker and hedging:
+
+    flaky   a fraction of Groq calls return 503     -> share of requests with an AI verdict
+    outage  every Groq call hangs past the timeout  -> /analyze latency
+    tail    a few Groq calls are slow               -> /analyze p99 latency
+
+Run from web_app/backend:
+    python benchmarks/llm_faults.py --clients 20 --requests 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+from groq_stub import make_stub_app, serve_in_thread
+from load_analyze import APP_PORT, STUB_PORT, TEXTS, start_backend
+
+READ_TIMEOUT = 2.0
+
+
+async def drive(clients, total):
+    latencies = []
+    ai_ok = 0
+    counter = iter(range(total))
+
+    async def worker(client):
+        nonlocal ai_ok
+        for i in counter:
+            # Unique texts: nothing is coalesced
+            payload = {"text": f"{TEXTS[i % len(TEXTS)]} #{time.time_ns()}-{i}", "message_type": "email"}
+            t0 = time.perf_counter()
+            resp = await client.post("/analyze", json=payload)
+            latencies.append(time.perf_counter() - t0)
+            if resp.status_code == 200 and resp.json()["ai_result"] is not None:
+                ai_ok += 1
+
+    limits = httpx.Limits(max_connections=clients)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{APP_PORT}", limits=limits, timeout=120) as client:
+        await asyncio.gather(*(worker(client) for _ in range(clients)))
+
+    latencies.sort()
+    return {
+        "ai_rate": ai_ok / total,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
+
+
+def configure(llm, resilient, hedge=False):
+    from llm_client import CircuitBreaker
+    llm.retry.max_retries = 2 if resilient else 0
+    llm.breaker = CircuitBreaker(5, 30) if resilient else CircuitBreaker(10 ** 9, 0)
+    llm.hedge = hedge
+    llm._latencies.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/analyze under injected Groq faults")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--delay", type=float, default=0.05, help="normal stub latency (s)")
+    args = parser.parse_args()
+
+    stub = make_stub_app(args.delay)
+    serve_in_thread(stub, STUB_PORT)
+    backend = start_backend({"ANALYZE_CACHE_ENTRIES": "0", "GROQ_READ_TIMEOUT": str(READ_TIMEOUT)})
+
+    scenarios = [
+        ("flaky", {"error_rate": 0.2}, [("single attempt", False, False), ("retries+breaker", True, False)]),
+        ("outage", {"slow_rate": 1.0, "slow_delay": 10.0}, [("single attempt", False, False), ("retries+breaker", True, False)]),
+        ("tail", {"slow_rate": 0.05, "slow_delay": 1.0}, [("no hedging", True, False), ("hedged", True, True)]),
+    ]
+    print(f"{'scenario':<8} {'client':<16} {'AI verdicts':>11} {'p50 (ms)':>9} {'p99 (ms)':>9} {'Groq calls':>10}")
+    for name, faults, variants in scenarios:
+        for label, resilient, hedge in variants:
+            configure(backend.llm, resilient, hedge)
+            stub.state.faults.update({"error_rate": 0.0, "slow_rate": 0.0})
+            if hedge:
+                # Hedging needs a latency baseline first
+                asyncio.run(drive(args.clients, 50))
+            stub.state.faults.update(faults)
+            calls = stub.state.calls
+            stats = asyncio.run(drive(args.clients, args.requests))
+            print(f"{name:<8} {label:<16} {stats['ai_rate']:>10.0%} {stats['p50_ms']:>9.1f} "
+                  f"{stats['p99_ms']:>9.1f} {stub.state.calls - calls:>10}")
+    print("counters:", {k: v for k, v in backend.metrics.snapshot("llm.").items()})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Load test: /analyze throughput against a local Groq stub.
+
+Starts the stub and the backend in-process (result cache off) and drives
+/analyze with N concurrent clients, every request with a unique text, so
+each one needs its own Groq call. Reports throughput and latency
+percentiles.
+
+Run from web_app/backend:
+    python benchmarks/load_analyze.py --clients 100 --requests 1000 --delay 0.2
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from groq_stub import make_stub_app, serve_in_thread
+
+STUB_PORT = 8901
+APP_PORT = 8902
+
+TEXTS = [
+    "URGENT: your account is suspended, click here to verify account details now!",
+    "Hi team, just checking in about the meeting tomorrow at 10am.",
+    "Send 0.5 BTC to this wallet to decrypt your locked files.",
+]
+
+
+async def drive(clients, total, path="/analyze", payload_fn=None):
+    # Unique texts by default: nothing is served from a cache or coalesced
+    payload_fn = payload_fn or (
+        lambda i: {"text": f"{TEXTS[i % len(TEXTS)]} #{time.time_ns()}-{i}", "message_type": "email"}
+    )
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker(client):
+        nonlocal errors
+        for i in counter:
+            t0 = time.perf_counter()
+            resp = await client.post(path, json=payload_fn(i))
+            latencies.append(time.perf_counter() - t0)
+            if resp.status_code != 200:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=clients)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{APP_PORT}", limits=limits, timeout=120) as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(clients)))
+        elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "rps": total / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
+
+
+def start_backend(env=None):
+    """Import the backend pointed at the stub and serve it on APP_PORT."""
+    os.environ.setdefault("GROQ_API_KEY", "stub-key")
+    os.environ["GROQ_API_URL"] = f"http://127.0.0.1:{STUB_PORT}/openai/v1/chat/completions"
+    os.environ.update(env or {})
+    import main
+    serve_in_thread(main.app, APP_PORT)
+    while httpx.get(f"http://127.0.0.1:{APP_PORT}/readyz").status_code != 200:
+        time.sleep(0.1)
+    return main
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /analyze against a Groq stub")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--delay", type=float, default=0.2, help="stub latency per Groq call (s)")
+    args = parser.parse_args()
+
+    stub = make_stub_app(args.delay)
+    serve_in_thread(stub, STUB_PORT)
+    start_backend({"ANALYZE_CACHE_ENTRIES": "0"})
+
+    stats = asyncio.run(drive(args.clients, args.requests))
+    print(f"clients={args.clients} stub_delay={args.delay}s upstream_calls={stub.state.calls}")
+    for key, value in stats.items():
+        print(f"  {key:>10}: {value:.2f}" if isinstance(value, float) else f"  {key:>10}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Token-budgeted prompt assembly for /chat and /chat/stream.
+
+The client sends the whole conversation back on every turn. Instead of a
+fixed last-N slice (where a few pasted emails can still make the prompt
+huge), the prompt is fitted to a token budget:
+
+    system prompt (token count computed once)
+    + condensed summary of turns that no longer fit, if any
+    + as many recent turns as fit, newest first, each capped in length
+    + the current message
+    + a reserve left free for the reply
+
+Token counts use tiktoken when it is installed and a word/punctuation
+estimate otherwise; either way they are only an approximation of the
+Llama tokenizer, so the budget should keep some headroom.
+"""
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Literal
+
+from pydantic import BaseModel, field_validator
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # not installed, or the encoding file cannot be fetched
+    _encoding = None
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+TRUNCATION_MARK = " [...] "
+# Words kept per turn in the condensed summary of dropped turns
+SUMMARY_WORDS_PER_TURN = 24
+# Longest chat message accepted, in characters (a long pasted email fits)
+MAX_CONTENT_CHARS = 32000
+
+
+class ChatMessage(BaseModel):
+    role: Literal["user", "assistant"]
+    content: str
+
+    @field_validator("content", mode="before")
+    @classmethod
+    def _cap(cls, v):
+        # Cut rather than reject: the client resends old turns on every message,
+        # so one oversized turn would otherwise fail the rest of the session
+        return v[:MAX_CONTENT_CHARS] if isinstance(v, str) else v
+
+
+def _count(text):
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    # Subword tokenizers split long words; ~4 characters per token for those
+    return sum(1 + len(w) // 8 for w in _TOKEN_RE.findall(text))
+
+
+def _digest(text):
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+class _DigestLRU:
+    """
+    LRU keyed by a digest of the text rather than the text itself, so a
+    cached pasted email does not stay in memory; values are small (a
+    count, or a text already cut down to a token cap).
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+_token_counts = _DigestLRU(4096)
+_truncations = _DigestLRU(1024)
+
+
+def count_tokens(text):
+    """
+    Approximate token count. Cached by content: the same history is resent
+    on every turn, so most lookups are hits.
+    """
+    key = _digest(text)
+    count = _token_counts.get(key)
+    if count is None:
+        count = _count(text)
+        _token_counts.put(key, count)
+    return count
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Keep the head and tail of text within about max_tokens (cached like count_tokens)."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    key = (_digest(text), max_tokens)
+    cut = _truncations.get(key)
+    if cut is None:
+        cut = _truncate(text, max_tokens)
+        _truncations.put(key, cut)
+    return cut
+
+
+def _truncate(text, max_tokens):
+    words = text.split(" ")
+    # Binary search for the largest head+tail word count that fits
+    lo, hi = 0, len(words)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        head, tail = words[:(mid + 1) // 2], words[len(words) - mid // 2:] if mid // 2 else []
+        if _count(" ".join(head) + TRUNCATION_MARK + " ".join(tail)) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    head, tail = words[:(lo + 1) // 2], words[len(words) - lo // 2:] if lo // 2 else []
+    return " ".join(head) + TRUNCATION_MARK + " ".join(tail)
+
+
+def _condense(turns, max_tokens):
+    """
+    Extractive summary of dropped turns: the opening words of each, oldest
+    first. Returns (text or None, number of turns it covers).
+    """
+    header = "Earlier in this conversation (condensed):"
+    remaining = max_tokens - count_tokens(header)
+    lines = []
+    # Newest dropped turns first: they are the most relevant when not all fit
+    for turn in reversed(turns):
+        words = turn.content.split()
+        snippet = " ".join(words[:SUMMARY_WORDS_PER_TURN]) + ("..." if len(words) > SUMMARY_WORDS_PER_TURN else "")
+        line = f"- {turn.role}: {snippet}"
+        cost = count_tokens(line) + 1
+        if cost > remaining:
+            break
+        lines.append(line)
+        remaining -= cost
+    if not lines:
+        return None, 0
+    return header + "\n" + "\n".join(reversed(lines)), len(lines)
+
+
+class ChatHistoryManager:
+    def __init__(self, system_prompt, budget=3000, max_message_tokens=600, summary_tokens=200,
+                 reply_reserve=512):
+        self.budget = budget
+        self.max_message_tokens = max_message_tokens
+        self.summary_tokens = summary_tokens
+        self.reply_reserve = reply_reserve
+        # The system prompt is identical on every request: build it once
+        self._system = {"role": "system", "content": system_prompt}
+        self._system_tokens = count_tokens(system_prompt)
+
+    @property
+    def system_tokens(self):
+        return self._system_tokens
+
+    def build(self, message, history: List[ChatMessage]):
+        """
+        Returns (messages, stats). stats has prompt_tokens, kept, summarized,
+        truncated (turns cut to max_message_tokens) and dropped.
+        """
+        available = self.budget - self.reply_reserve - self._system_tokens
+        truncated = 0
+
+        # The current message always goes in, cut down if it alone is too big
+        current = truncate_to_tokens(message, max(available // 2, self.max_message_tokens))
+        if current != message:
+            truncated += 1
+        available -= count_tokens(current)
+
+        # Newest turns first until the budget (minus room for a summary) runs out
+        kept = []
+        remaining = available - self.summary_tokens
+        cut = len(history)
+        for i in range(len(history) - 1, -1, -1):
+            turn = history[i]
+            content = truncate_to_tokens(turn.content, self.max_message_tokens)
+            cost = count_tokens(content)
+            if cost > remaining:
+                break
+            if content != turn.content:
+                truncated += 1
+            kept.append({"role": turn.role, "content": content})
+            remaining -= cost
+            cut = i
+        kept.reverse()
+
+        messages = [self._system]
+        summary, summarized = _condense(history[:cut], self.summary_tokens) if cut else (None, 0)
+        if summary:
+            messages.append({"role": "system", "content": summary})
+        messages.extend(kept)
+        messages.append({"role": "user", "content": current})
+
+        prompt_tokens = self._system_tokens + sum(count_tokens(m["content"]) for m in messages[1:])
+        return messages, {
+            "prompt_tokens": prompt_tokens,
+            "kept": len(kept),
+            "summarized": summarized,
+            "truncated": truncated,
+            "dropped": cut - summarized,
+        }
@@ -0,0 +1,107 @@
+"""
+Stateless hashing feature pipeline, an alternative to TfidfVectorizer.
+
+TfidfVectorizer keeps a Python dict vocabulary that is pickled into
+vectorizer.pkl and rebuilt on every load. HashingFeatures maps tokens
+straight to columns with a hash, so the only learned state is one NumPy
+array of IDF weights. The pickle is a few KB and loads almost instantly.
+Any process can transform independently, and document frequencies can be
+accumulated chunk by chunk with partial_fit.
+
+It is pickled into vectorizer.pkl like the TF-IDF vectorizer, so every
+loader (main.py, scan.py, pages/user_query.py) picks it up unchanged.
+Train with it via:
+    python train_model.py --features hashing
+"""
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction import FeatureHasher
+from sklearn.feature_extraction.text import HashingVectorizer
+
+# Small enough that the dense rows FlatForest builds stay cheap; a random
+# forest only ever splits on a few hundred columns anyway
+DEFAULT_N_FEATURES = 2 ** 12
+# Texts per chunk handed to each worker in a parallel transform
+TRANSFORM_CHUNK = 2048
+
+
+class HashingFeatures:
+    """
+    Hashed term counts, optionally IDF-weighted, L2-normalized: the same
+    shape of features TfidfVectorizer(stop_words='english') produces.
+    """
+
+    def __init__(self, n_features=DEFAULT_N_FEATURES, use_idf=True, stop_words="english"):
+        self.n_features = n_features
+        self.use_idf = use_idf
+        self.stop_words = stop_words
+        self.n_docs_ = 0
+        self.doc_freq_ = np.zeros(n_features, dtype=np.int64)
+        self.idf_ = None
+        self._analyzer = None
+        self._hasher = None
+
+    def _hash(self, texts):
+        # Analyzer and hasher are built once per process; HashingVectorizer
+        # re-validates and rebuilds them on every transform call, which
+        # dominates single-text latency
+        if self._analyzer is None:
+            vectorizer = HashingVectorizer(
+                n_features=self.n_features, stop_words=self.stop_words,
+                alternate_sign=False, norm=None, dtype=np.float64,
+            )
+            self._analyzer = vectorizer.build_analyzer()
+            self._hasher = FeatureHasher(
+                n_features=self.n_features, input_type="string",
+                alternate_sign=False, dtype=np.float64,
+            )
+        X = self._hasher.transform(self._analyzer(t) for t in texts)
+        X.sum_duplicates()
+        return X
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_analyzer"] = state["_hasher"] = None
+        return state
+
+    def partial_fit(self, texts):
+        """Add one chunk of documents to the IDF statistics."""
+        if self.use_idf:
+            counts = self._hash(texts).tocsc()
+            self.doc_freq_ += np.diff(counts.indptr)
+            self.n_docs_ += counts.shape[0]
+            # Smoothed IDF, as TfidfVectorizer computes it
+            self.idf_ = np.log((1 + self.n_docs_) / (1 + self.doc_freq_)) + 1
+        return self
+
+    def fit(self, texts):
+        self.n_docs_ = 0
+        self.doc_freq_ = np.zeros(self.n_features, dtype=np.int64)
+        return self.partial_fit(texts)
+
+    def _transform_chunk(self, texts):
+        X = self._hash(texts)
+        if self.use_idf and self.idf_ is not None:
+            X.data *= self.idf_[X.indices]
+        # Row-wise L2 normalization, done directly on the CSR buffers
+        rows = np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))
+        norms = np.sqrt(np.bincount(rows, weights=X.data ** 2, minlength=X.shape[0]))
+        X.data /= np.where(norms > 0, norms, 1.0)[rows]
+        return X
+
+    def transform(self, texts, n_jobs=1):
+        """
+        Feature matrix for texts. n_jobs > 1 splits the texts into chunks
+        and hashes them in a process pool; there is no vocabulary to share.
+        """
+        texts = list(texts)
+        if n_jobs == 1 or len(texts) <= TRANSFORM_CHUNK:
+            return self._transform_chunk(texts)
+        from joblib import Parallel, delayed
+        chunks = [texts[i:i + TRANSFORM_CHUNK] for i in range(0, len(texts), TRANSFORM_CHUNK)]
+        parts = Parallel(n_jobs=n_jobs)(delayed(self._transform_chunk)(c) for c in chunks)
+        return sp.vstack(parts, format="csr")
+
+    def fit_transform(self, texts):
+        texts = list(texts)
+        return self.fit(texts).transform(texts)
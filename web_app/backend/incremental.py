@@ -0,0 +1,233 @@
+"""
+Out-of-core training for large labelled threat corpora.
+
+model/train_model.py loads the whole workbook and fits TF-IDF + a
+RandomForest in memory. This streams labelled records from chunked files
+(.csv, .jsonl, .parquet, .feather, .xlsx, or directories of them) and
+trains an incremental classifier with partial_fit on mini-batches over the
+stateless HashingFeatures pipeline (features.py), so memory stays flat in
+the corpus size.
+
+One cheap stats pass collects the label set and IDF weights (skip it with
+--no-idf --classes ...), then each training pass scores every mini-batch
+before learning from it (progressive validation accuracy). Checkpoints
+are written every --checkpoint-every batches and can be resumed with
+--resume. The final model.pkl / vectorizer.pkl load in main.py, scan.py
+and pages/user_query.py like the RandomForest artifacts.
+
+Usage (from web_app/backend):
+    python incremental.py alerts/*.csv --out model_stream --batch-size 20000
+    python incremental.py alerts/ --out model_stream --resume
+"""
+import argparse
+import json
+import os
+import pickle
+import shutil
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows: no getrusage, peak RSS is not reported
+    resource = None
+
+from features import HashingFeatures, DEFAULT_N_FEATURES
+from scan import collect_files
+
+TRAIN_EXTENSIONS = {".csv", ".jsonl", ".ndjson", ".parquet", ".feather", ".xlsx"}
+# Rows pulled from a file per read; independent of the training batch size
+READ_CHUNK_ROWS = 50000
+CHECKPOINT_DIR = "checkpoint"
+
+
+def peak_rss():
+    """", peak RSS N MB" for progress lines, or "" where it cannot be measured."""
+    if resource is None:
+        return ""
+    # ru_maxrss is KB on Linux
+    return f", peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB"
+
+
+# --- RECORD STREAM ---
+def read_frames(path, columns):
+    """Yield DataFrames of at most READ_CHUNK_ROWS rows with the given columns."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        yield from pd.read_csv(path, usecols=columns, chunksize=READ_CHUNK_ROWS)
+    elif ext in (".jsonl", ".ndjson"):
+        for frame in pd.read_json(path, lines=True, chunksize=READ_CHUNK_ROWS):
+            yield frame[columns]
+    elif ext == ".parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=READ_CHUNK_ROWS, columns=columns):
+            yield batch.to_pandas()
+    elif ext == ".feather":
+        import pyarrow.feather as feather
+        yield feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+    else:
+        # Workbooks cannot be read incrementally; fine for the small seed set
+        yield pd.read_excel(path, usecols=columns)
+
+
+def iter_batches(files, text_column, label_column, batch_size, skip=0):
+    """
+    Yield (texts, labels) lists of batch_size records across all files,
+    after skipping the first `skip` records (used when resuming).
+    """
+    texts, labels = [], []
+    for path in files:
+        for frame in read_frames(path, [text_column, label_column]):
+            frame = frame.dropna()
+            if skip:
+                dropped = min(skip, len(frame))
+                frame = frame.iloc[dropped:]
+                skip -= dropped
+            texts.extend(frame[text_column].astype(str).tolist())
+            labels.extend(frame[label_column].astype(str).tolist())
+            while len(texts) >= batch_size:
+                yield texts[:batch_size], labels[:batch_size]
+                texts, labels = texts[batch_size:], labels[batch_size:]
+    if texts:
+        yield texts, labels
+
+
+# --- ARTIFACTS ---
+def write_artifacts(out_dir, model, vectorizer, state=None):
+    """Write model.pkl / vectorizer.pkl (+ state.json) atomically via temp files."""
+    os.makedirs(out_dir, exist_ok=True)
+    items = [("model.pkl", model), ("vectorizer.pkl", vectorizer)]
+    for name, obj in items:
+        tmp = os.path.join(out_dir, name + ".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(obj, f)
+        os.replace(tmp, os.path.join(out_dir, name))
+    if state is not None:
+        tmp = os.path.join(out_dir, "state.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, os.path.join(out_dir, "state.json"))
+
+
+def load_checkpoint(ckpt_dir):
+    with open(os.path.join(ckpt_dir, "model.pkl"), "rb") as f:
+        model = pickle.load(f)
+    with open(os.path.join(ckpt_dir, "vectorizer.pkl"), "rb") as f:
+        vectorizer = pickle.load(f)
+    with open(os.path.join(ckpt_dir, "state.json")) as f:
+        state = json.load(f)
+    return model, vectorizer, state
+
+
+def new_classifier(kind, alpha=None):
+    if kind == "nb":
+        from sklearn.naive_bayes import MultinomialNB
+        return MultinomialNB(alpha=1.0 if alpha is None else alpha)
+    from sklearn.linear_model import SGDClassifier
+    # log_loss so predict_proba (used for ML confidence) is available
+    return SGDClassifier(loss="log_loss", alpha=1e-5 if alpha is None else alpha, random_state=42)
+
+
+# --- TRAINING ---
+def stats_pass(files, args, vectorizer):
+    """One streaming pass for the label set and (optionally) the IDF weights."""
+    classes = set()
+    records = 0
+    t0 = time.perf_counter()
+    for texts, labels in iter_batches(files, args.text_column, args.label_column, args.batch_size):
+        classes.update(labels)
+        if vectorizer.use_idf:
+            vectorizer.partial_fit(texts)
+        records += len(texts)
+    elapsed = time.perf_counter() - t0
+    print(f"Stats pass: {records} records, {len(classes)} classes in {elapsed:.1f}s "
+          f"({records / max(elapsed, 1e-9):.0f} records/s{peak_rss()})")
+    return sorted(classes)
+
+
+def train(args):
+    files = list(collect_files(args.paths, TRAIN_EXTENSIONS))
+    if not files:
+        sys.exit("No training files found.")
+    ckpt_dir = os.path.join(args.out, CHECKPOINT_DIR)
+
+    if args.resume and os.path.exists(os.path.join(ckpt_dir, "state.json")):
+        model, vectorizer, state = load_checkpoint(ckpt_dir)
+        classes = state["classes"]
+        print(f"Resuming at epoch {state['epoch'] + 1}, record {state['records_in_epoch']}")
+    else:
+        vectorizer = HashingFeatures(n_features=args.n_features, use_idf=not args.no_idf)
+        if args.classes and args.no_idf:
+            classes = sorted(args.classes)
+        else:
+            classes = stats_pass(files, args, vectorizer)
+        model = new_classifier(args.classifier, args.alpha)
+        state = {"classes": classes, "epoch": 0, "records_in_epoch": 0, "records_total": 0, "batches": 0}
+
+    classes_arr = np.asarray(classes, dtype=object)
+    t0 = time.perf_counter()
+    records_run = 0
+    for epoch in range(state["epoch"], args.epochs):
+        correct = seen = 0
+        skip = state["records_in_epoch"] if epoch == state["epoch"] else 0
+        for texts, labels in iter_batches(files, args.text_column, args.label_column, args.batch_size, skip):
+            X = vectorizer.transform(texts)
+            y = np.asarray(labels, dtype=object)
+            if state["batches"]:
+                # Score before learning: an honest running accuracy without a holdout
+                correct += int((model.predict(X) == y).sum())
+                seen += len(y)
+            model.partial_fit(X, y, classes=classes_arr)
+
+            state["batches"] += 1
+            state["records_in_epoch"] += len(texts)
+            state["records_total"] += len(texts)
+            records_run += len(texts)
+
+            if state["batches"] % args.log_every == 0:
+                elapsed = time.perf_counter() - t0
+                acc = f"{correct / seen:.3f}" if seen else "n/a"
+                print(f"epoch {epoch + 1} batch {state['batches']}: {state['records_total']} records, "
+                      f"{records_run / elapsed:.0f} records/s, progressive acc {acc}{peak_rss()}")
+            if args.checkpoint_every and state["batches"] % args.checkpoint_every == 0:
+                state["epoch"] = epoch
+                write_artifacts(ckpt_dir, model, vectorizer, state)
+
+        acc = f"{correct / seen:.3f}" if seen else "n/a"
+        print(f"Epoch {epoch + 1} done: {state['records_in_epoch']} records, progressive acc {acc}")
+        state["epoch"] = epoch + 1
+        state["records_in_epoch"] = 0
+
+    elapsed = time.perf_counter() - t0
+    write_artifacts(args.out, model, vectorizer)
+    shutil.rmtree(ckpt_dir, ignore_errors=True)
+    print(f"Trained on {records_run} records in {elapsed:.1f}s ({records_run / max(elapsed, 1e-9):.0f} records/s)"
+          f"{peak_rss()}.")
+    print(f"Artifacts saved: {os.path.join(args.out, 'model.pkl')}, {os.path.join(args.out, 'vectorizer.pkl')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Out-of-core incremental ThreatNet training")
+    parser.add_argument("paths", nargs="+", help="labelled files or directories")
+    parser.add_argument("--out", required=True, help="artifact directory (serve with MODEL_DIR, or publish with registry.py import)")
+    parser.add_argument("--text-column", default="threat_text")
+    parser.add_argument("--label-column", default="attack_type")
+    parser.add_argument("--classifier", choices=["sgd", "nb"], default="sgd",
+                        help="sgd: logistic regression via SGD; nb: multinomial naive Bayes")
+    parser.add_argument("--alpha", type=float, help="SGD regularization (1e-5) / NB smoothing (1.0)")
+    parser.add_argument("--batch-size", type=int, default=10000, help="records per partial_fit call")
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--n-features", type=int, default=DEFAULT_N_FEATURES)
+    parser.add_argument("--no-idf", action="store_true", help="skip IDF weighting (and the stats pass with --classes)")
+    parser.add_argument("--classes", nargs="+", help="label set, needed up front by partial_fit with --no-idf")
+    parser.add_argument("--checkpoint-every", type=int, default=50, help="batches between checkpoints (0 = off)")
+    parser.add_argument("--log-every", type=int, default=10, help="batches between progress lines")
+    parser.add_argument("--resume", action="store_true", help="continue from OUT/checkpoint")
+    train(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
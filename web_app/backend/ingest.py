@@ -0,0 +1,108 @@
+"""
+Streaming NDJSON ingest helpers.
+
+The request body is consumed chunk by chunk and split into records, which
+are grouped into micro-batches. Everything is a lazy async generator, so the
+upload is only read as fast as verdicts are written back: memory stays at
+one batch plus one partial line regardless of upload size.
+"""
+import json
+
+from fastapi.responses import StreamingResponse
+from starlette.requests import ClientDisconnect
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that does not poll `receive` for disconnects while
+    streaming. The stock one does (on ASGI < 2.4 servers), which swallows the
+    request body we are still reading. A client that goes away surfaces as
+    ClientDisconnect from request.stream() instead.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            # Websocket denial responses never read a body; keep Starlette's handling
+            await super().__call__(scope, receive, send)
+            return
+        try:
+            await self.stream_response(send)
+        except OSError:
+            # As Starlette does: a write to a closed connection is a disconnect
+            raise ClientDisconnect()
+        if self.background is not None:
+            await self.background()
+
+
+class OversizedLine:
+    """Placeholder for a line that exceeded the size cap and was skipped."""
+
+
+async def iter_lines(chunks, max_line_bytes):
+    """Yield (line_no, bytes | OversizedLine) from an async byte-chunk iterator."""
+    buffer = b""
+    line_no = 0
+    skipping = False
+    async for chunk in chunks:
+        buffer += chunk
+        # Walk the lines by offset and cut the remainder once per chunk;
+        # slicing the rest off after every line is quadratic in lines per chunk
+        start = 0
+        while True:
+            nl = buffer.find(b"\n", start)
+            if nl < 0:
+                break
+            line = buffer[start:nl]
+            start = nl + 1
+            line_no += 1
+            if skipping or len(line) > max_line_bytes:
+                skipping = False
+                yield line_no, OversizedLine()
+            else:
+                yield line_no, line.rstrip(b"\r")
+        buffer = buffer[start:]
+        if len(buffer) > max_line_bytes:
+            # Drop what we have and discard until the next newline
+            skipping = True
+            buffer = b""
+    if skipping:
+        yield line_no + 1, OversizedLine()
+    elif buffer.strip():
+        yield line_no + 1, buffer.rstrip(b"\r")
+
+
+def parse_record(line_no, line):
+    """
+    A line is either a JSON object with a "text" field (and optional "id")
+    or plain text. Returns a record dict, or None for blank lines.
+    """
+    if isinstance(line, OversizedLine):
+        return {"line": line_no, "id": None, "text": None, "error": "line too long"}
+    raw = line.decode("utf-8", errors="replace").strip()
+    if not raw:
+        return None
+    if raw.startswith("{"):
+        try:
+            obj = json.loads(raw)
+            text = obj.get("text")
+            if not isinstance(text, str):
+                return {"line": line_no, "id": obj.get("id"), "text": None, "error": "missing text field"}
+            return {"line": line_no, "id": obj.get("id"), "text": text, "error": None}
+        except ValueError:
+            pass
+    return {"line": line_no, "id": None, "text": raw, "error": None}
+
+
+async def micro_batches(chunks, batch_size, max_line_bytes):
+    """Group parsed records from a byte stream into lists of up to batch_size."""
+    batch = []
+    async for line_no, line in iter_lines(chunks, max_line_bytes):
+        record = parse_record(line_no, line)
+        if record is None:
+            continue
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
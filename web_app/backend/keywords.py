@@ -0,0 +1,148 @@
+"""
+Heuristic keyword engine for the /analyze fallback.
+
+All category patterns are compiled into one automaton at startup. A single
+scan of the input counts hits for every category at once and records where
+each pattern matched. Extra pattern packs (JSON files) can be loaded at
+runtime; the compiled state is rebuilt off to the side and swapped in whole.
+"""
+import glob
+import json
+import os
+
+from signatures import new_automaton
+
+DEFAULT_PATTERNS = {
+    'Phishing': ['verify account', 'confirm identity', 'urgent action', 'click here', 'suspended account', 'unusual activity', 'verify now', 'confirm password', 'account locked', 'login attempt', 'security alert', 'bank account', 'update information'],
+    'Malware': ['download attachment', 'open file', 'install', '.exe', 'virus', 'infected', 'enable macros', '.zip', '.rar', 'malicious', 'trojan'],
+    'Ransomware': ['bitcoin', 'payment required', 'locked files', 'decrypt', 'ransom', 'encrypted', 'wallet', 'btc', 'pay now'],
+    'Spam': ['win prize', 'congratulations', 'free', 'limited offer', 'act now', 'special promotion', 'winner', 'lottery', 'inheritance', '100% free', 'buy now'],
+    'SQL Injection': ['drop table', 'select *', 'union select', '1=1', 'or 1=1', '--', 'delete from', 'insert into', 'update set'],
+    'DDoS': ['flood', 'overwhelm', 'traffic spike', 'denial of service', 'packet flood', 'botnet']
+}
+
+# Tie-break order when two categories score the same (most severe first).
+CATEGORY_PRIORITY = ['Ransomware', 'Malware', 'Phishing', 'SQL Injection', 'DDoS', 'Spam']
+
+PATTERN_DIR = os.getenv(
+    "THREATNET_PATTERN_DIR",
+    os.path.join(os.path.dirname(__file__), "patterns")
+)
+
+
+class _Compiled:
+    """Immutable compiled state; replaced as a whole on reload."""
+
+    def __init__(self, patterns):
+        self.patterns = {}
+        owners = {}
+        for category, words in patterns.items():
+            bucket = self.patterns.setdefault(category, [])
+            for word in words:
+                word = str(word).lower()
+                if not word or word in bucket:
+                    continue
+                bucket.append(word)
+                owners.setdefault(word, []).append((category, len(bucket) - 1))
+
+        self.automaton = new_automaton()
+        for word, owner in owners.items():
+            self.automaton.add_word(word, (word, tuple(owner)))
+        if owners:
+            self.automaton.make_automaton()
+        self.empty = not owners
+        self.size = len(owners)
+
+
+def _validate_pack(pack, name):
+    """Raise ValueError unless pack maps category names to lists of non-empty strings."""
+    if not isinstance(pack, dict):
+        raise ValueError(f"{name}: expected an object of category -> [patterns]")
+    for category, words in pack.items():
+        if not isinstance(words, list):
+            raise ValueError(f"{name}: patterns for {category!r} must be a list")
+        for word in words:
+            if not isinstance(word, str) or not word.strip():
+                raise ValueError(f"{name}: {category!r} has a pattern that is not a non-empty string")
+
+
+class KeywordEngine:
+    def __init__(self, base_patterns=None, pattern_dir=PATTERN_DIR):
+        self.base_patterns = base_patterns or DEFAULT_PATTERNS
+        self.pattern_dir = pattern_dir
+        self.loaded_packs = []
+        self._compiled = _Compiled(self.base_patterns)
+
+    def __len__(self):
+        return self._compiled.size
+
+    def reload(self):
+        """
+        Rebuild from the base patterns plus every *.json pack in pattern_dir.
+        Raises ValueError on a malformed pack; the current patterns stay in use.
+        """
+        merged = {c: list(words) for c, words in self.base_patterns.items()}
+        packs = []
+        if self.pattern_dir and os.path.isdir(self.pattern_dir):
+            for path in sorted(glob.glob(os.path.join(self.pattern_dir, "*.json"))):
+                with open(path, encoding="utf-8") as f:
+                    pack = json.load(f)
+                _validate_pack(pack, os.path.basename(path))
+                for category, words in pack.items():
+                    merged.setdefault(category, []).extend(words)
+                packs.append(os.path.basename(path))
+        compiled = _Compiled(merged)
+        self._compiled = compiled
+        self.loaded_packs = packs
+        return {"patterns": compiled.size, "packs": packs}
+
+    def scan(self, text_lower):
+        """
+        Single pass over the text. Returns per-category hit lists, each hit
+        being {"pattern", "start", "end"} (end exclusive).
+        """
+        compiled = self._compiled
+        hits = {}
+        if compiled.empty:
+            return hits
+        for end, (word, owner) in compiled.automaton.iter(text_lower):
+            start = end - len(word) + 1
+            for category, order in owner:
+                hits.setdefault(category, []).append((order, word, start, end + 1))
+        return {
+            category: [{"pattern": w, "start": s, "end": e} for _, w, s, e in sorted(found)]
+            for category, found in hits.items()
+        }
+
+    def classify(self, text_lower):
+        """
+        Score every category by number of distinct patterns matched and pick
+        the best one. Returns None when nothing matched.
+        """
+        hits = self.scan(text_lower)
+        if not hits:
+            return None
+
+        scores = {}
+        matched = {}
+        for category, found in hits.items():
+            distinct = []
+            for h in found:
+                if h["pattern"] not in distinct:
+                    distinct.append(h["pattern"])
+            matched[category] = distinct
+            scores[category] = len(distinct)
+
+        def rank(category):
+            prio = CATEGORY_PRIORITY.index(category) if category in CATEGORY_PRIORITY else len(CATEGORY_PRIORITY)
+            return (-scores[category], prio, category)
+
+        best = min(scores, key=rank)
+        return {
+            "threat_type": best,
+            "score": scores[best],
+            "matched_patterns": matched[best],
+            "offsets": hits[best],
+            "category_scores": scores,
+            "tied_categories": [c for c in scores if scores[c] == scores[best] and c != best],
+        }
@@ -0,0 +1,112 @@
+"""
+Micro-batching gateway for /analyze's Groq stage.
+
+Requests arriving within window seconds of each other (or until max_items
+are waiting) are packed into one batched prompt, so N concurrent analyses
+cost one Groq round trip instead of N. Each caller gets back the entry with
+its own id; ids the batched reply is missing or got wrong are re-asked with
+the ordinary single-message prompt. A batch of one, and texts over
+max_text_chars, skip batching altogether.
+
+Batches only ever hold messages of one message_type, each with its own
+queue and timer. Callers still share a prompt, so a crafted message can try
+to sway its neighbours' verdicts; the batch system prompt marks every
+message as untrusted data (analysis.BATCH_SYSTEM_PROMPT).
+
+The window adds up to `window` seconds to a lone request, so it only pays
+off when traffic is dense enough to fill batches.
+"""
+import asyncio
+
+import metrics
+from analysis import build_analysis_payload, build_batch_analysis_payload
+from llm_client import CircuitOpenError, LLMError
+from llm_output import parse_ai_batch, parse_ai_result
+
+
+class LLMBatcher:
+    def __init__(self, llm, window=0.01, max_items=8, max_text_chars=4000):
+        self.llm = llm
+        self.window = window
+        self.max_items = max_items
+        self.max_text_chars = max_text_chars
+        self._pending = {}  # message_type -> [(input_text, future)]
+        self._timers = {}
+        # The loop only holds tasks weakly; keep the in-flight batches alive here
+        self._tasks = set()
+
+    async def _single(self, input_text, message_type):
+        return parse_ai_result(await self.llm.chat(build_analysis_payload(input_text, message_type)))
+
+    async def submit(self, input_text, message_type):
+        """ai_result for one message, possibly answered as part of a batch. Raises LLMError."""
+        if len(input_text) > self.max_text_chars:
+            return await self._single(input_text, message_type)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending.setdefault(message_type, [])
+        pending.append((input_text, future))
+        if len(pending) >= self.max_items:
+            self._flush(message_type)
+        elif message_type not in self._timers:
+            self._timers[message_type] = loop.call_later(self.window, self._flush, message_type)
+        # shield: a caller timing out must not cancel the batch the others wait on
+        return await asyncio.shield(future)
+
+    def _flush(self, message_type):
+        timer = self._timers.pop(message_type, None)
+        if timer is not None:
+            timer.cancel()
+        items = self._pending.pop(message_type, [])
+        if items:
+            task = asyncio.ensure_future(self._run(items, message_type))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def aclose(self):
+        """Send whatever is still queued and wait for every in-flight batch."""
+        for message_type in list(self._pending):
+            self._flush(message_type)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _run(self, items, message_type):
+        try:
+            if len(items) == 1:
+                results = [await self._single(items[0][0], message_type)]
+            else:
+                results = await self._run_batch(items, message_type)
+        except BaseException as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e if isinstance(e, Exception) else LLMError("batch cancelled"))
+            if not isinstance(e, Exception):
+                raise
+            return
+        for (_, future), result in zip(items, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _run_batch(self, items, message_type):
+        metrics.inc("llm.batch.calls")
+        metrics.inc("llm.batch.items", len(items))
+        metrics.observe("llm.batch.size", len(items))
+        ids = list(range(len(items)))
+        payload = build_batch_analysis_payload(
+            [(i, text) for i, (text, _) in zip(ids, items)], message_type
+        )
+        parsed = parse_ai_batch(await self.llm.chat(payload), ids)
+
+        missing = [i for i in ids if i not in parsed]
+        if missing:
+            metrics.inc("llm.batch.fallbacks", len(missing))
+            retried = await asyncio.gather(
+                *(self._single(items[i][0], message_type) for i in missing), return_exceptions=True
+            )
+            for i, result in zip(missing, retried):
+                if isinstance(result, BaseException):
+                    if not isinstance(result, CircuitOpenError):
+                        print(f"Groq API Error (batch fallback): {result}")
+                    result = None
+                parsed[i] = result
+        return [parsed[i] for i in ids]
@@ -0,0 +1,347 @@
+"""
+Groq chat-completions client shared by /analyze, /chat, /chat/stream and
+scan.py --llm.
+
+One place for the URL, headers and pooled connections, plus the failure
+handling the call sites used to improvise:
+
+- bounded retries with jittered exponential backoff on 429/5xx and
+  connection errors (Retry-After is honoured, capped at backoff_max), all
+  within a per-call deadline;
+- a circuit breaker: after failure_threshold consecutive failed calls it
+  opens and calls fail immediately with CircuitOpenError for reset_timeout
+  seconds, then a single probe decides whether to close it again. During an
+  outage /analyze then returns its local verdict at once instead of waiting
+  out a timeout per request;
+- optional hedging (async client only): if a call has not answered after
+  the recent p95 latency, a second identical request is sent and whichever
+  answers first wins.
+
+Errors surface as LLMError (CircuitOpenError for fast rejections).
+"""
+import asyncio
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+import httpx
+
+import metrics
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# Successful call latencies kept for the hedge delay
+LATENCY_WINDOW = 256
+# Hedging only starts once this many latencies have been seen
+HEDGE_MIN_SAMPLES = 20
+
+
+class LLMError(Exception):
+    """A Groq call that failed after retries; status is the last HTTP status, if any."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+    @property
+    def retryable(self):
+        return self.status is None or self.status in RETRYABLE_STATUS
+
+
+class CircuitOpenError(LLMError):
+    """Rejected without calling Groq because the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_at = None
+
+    def allow(self):
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self.state = "half_open"
+        # Half-open: one probe at a time, everyone else is still rejected.
+        # A probe that never reported back (cancelled) is replaced after reset_timeout.
+        now = time.monotonic()
+        if self.state == "half_open" and (self._probe_at is None or now - self._probe_at >= self.reset_timeout):
+            self._probe_at = now
+            return True
+        return False
+
+    def record_success(self):
+        if self.state != "closed":
+            print("Groq circuit breaker closed.")
+        self.state = "closed"
+        self.failures = 0
+        self._probe_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe_at = None
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                print(f"Groq circuit breaker open after {self.failures} failures; retrying in {self.reset_timeout}s.")
+                metrics.inc("llm.breaker.opened")
+            self.state = "open"
+            self._opened_at = time.monotonic()
+
+    def stats(self):
+        return {"state": self.state, "consecutive_failures": self.failures}
+
+
+class RetryPolicy:
+    def __init__(self, max_retries=2, backoff_base=0.25, backoff_max=4.0, deadline=45.0):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.deadline = deadline
+
+    def next_delay(self, attempt, error, started):
+        """Seconds to wait before retrying after attempt (0-based), or None to give up."""
+        if attempt >= self.max_retries or not error.retryable:
+            return None
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after is not None:
+            delay = min(self.backoff_max, max(delay, retry_after))
+        if time.monotonic() - started + delay >= self.deadline:
+            return None
+        return delay
+
+
+class _CallAttempts:
+    """
+    Retry bookkeeping for one logical call, shared by LLMClient.complete,
+    LLMClient.stream and SyncLLMClient.chat: breaker admission on creation,
+    then after each failed attempt failed() either returns the backoff delay
+    or records the failure with the breaker and raises.
+    """
+
+    def __init__(self, retry, breaker):
+        if not breaker.allow():
+            metrics.inc("llm.rejected")
+            raise CircuitOpenError("Groq circuit breaker is open")
+        metrics.inc("llm.calls")
+        self.retry = retry
+        self.breaker = breaker
+        self.started = time.monotonic()
+        self.attempt = 0
+
+    def succeeded(self):
+        self.breaker.record_success()
+
+    def failed(self, error):
+        """Seconds to wait before the next attempt; raises error once retries are spent."""
+        delay = self.retry.next_delay(self.attempt, error, self.started)
+        if delay is None:
+            metrics.inc("llm.failures")
+            # Client errors (bad payload, auth) are not an outage
+            if error.retryable:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise error
+        metrics.inc("llm.retries")
+        self.attempt += 1
+        return delay
+
+
+def _status_error(resp, body):
+    error = LLMError(f"Groq API returned {resp.status_code}: {body[:300]}", resp.status_code)
+    try:
+        error.retry_after = float(resp.headers.get("retry-after", ""))
+    except ValueError:
+        pass
+    return error
+
+
+def _transport_error(e):
+    return LLMError(f"Groq API unreachable: {type(e).__name__}: {e}")
+
+
+def _content(data):
+    return data["choices"][0]["message"]["content"]
+
+
+class LLMClient:
+    """Async client for the backend: pooled connections, bounded concurrency."""
+
+    def __init__(self, url, api_key, connect_timeout=5.0, read_timeout=30.0, max_concurrency=32,
+                 retry=None, breaker=None, hedge=False):
+        self.url = url
+        self.api_key = api_key
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_concurrency = max_concurrency
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge = hedge
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._client = None
+        self._slots = None
+
+    async def start(self):
+        # The semaphore caps in-flight upstream calls; extra requests queue
+        # here instead of opening more sockets
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency,
+            ),
+        )
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def headers(self):
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+    def hedge_delay(self):
+        """p95 of recent successful calls, or None while hedging is off or warming up."""
+        if not self.hedge or len(self._latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    async def _post(self, payload):
+        async with self._slots:
+            t0 = time.monotonic()
+            resp = await self._client.post(self.url, headers=self.headers(), json=payload)
+            if resp.status_code == 200:
+                self._latencies.append(time.monotonic() - t0)
+            return resp
+
+    async def _send(self, payload):
+        """One attempt; with hedging, a second request races the first after the p95 delay."""
+        delay = self.hedge_delay()
+        first = asyncio.ensure_future(self._post(payload))
+        if delay is None:
+            return await first
+        pending = {first}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                metrics.inc("llm.hedged")
+                pending.add(asyncio.ensure_future(self._post(payload)))
+            outcome = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    outcome = task
+                    if task.exception() is None and task.result().status_code == 200:
+                        if task is not first:
+                            metrics.inc("llm.hedge_wins")
+                        return task.result()
+            # Neither succeeded: report the last one to finish
+            return outcome.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def complete(self, payload):
+        """POST payload with retries; returns the decoded response body."""
+        attempts = _CallAttempts(self.retry, self.breaker)
+        while True:
+            try:
+                resp = await self._send(payload)
+            except httpx.HTTPError as e:
+                error = _transport_error(e)
+            else:
+                if resp.status_code == 200:
+                    attempts.succeeded()
+                    metrics.observe("llm.latency", time.monotonic() - attempts.started)
+                    return resp.json()
+                error = _status_error(resp, resp.text)
+            await asyncio.sleep(attempts.failed(error))
+
+    async def chat(self, payload):
+        """Completion text for a non-streaming chat payload."""
+        return _content(await self.complete(payload))
+
+    @asynccontextmanager
+    async def stream(self, payload):
+        """
+        Open a streamed completion and yield the httpx response once Groq
+        has answered 200. Failures before that are retried like complete();
+        a stream that breaks after the first byte is not. The upstream
+        connection is closed when the block exits, including on cancellation.
+        """
+        attempts = _CallAttempts(self.retry, self.breaker)
+        while True:
+            await self._slots.acquire()
+            try:
+                request = self._client.build_request("POST", self.url, headers=self.headers(), json=payload)
+                resp = await self._client.send(request, stream=True)
+            except BaseException as e:
+                self._slots.release()
+                if not isinstance(e, httpx.HTTPError):
+                    raise
+                error = _transport_error(e)
+            else:
+                if resp.status_code == 200:
+                    break
+                try:
+                    body = (await resp.aread()).decode("utf-8", "replace")
+                    await resp.aclose()
+                finally:
+                    self._slots.release()
+                error = _status_error(resp, body)
+            await asyncio.sleep(attempts.failed(error))
+
+        attempts.succeeded()
+        try:
+            yield resp
+        except httpx.HTTPError as e:
+            raise _transport_error(e) from e
+        finally:
+            await resp.aclose()
+            self._slots.release()
+
+    def stats(self):
+        return {
+            **self.breaker.stats(),
+            "hedge_delay_s": self.hedge_delay(),
+            "latency_s": metrics.summary("llm.latency"),
+        }
+
+
+class SyncLLMClient:
+    """Blocking client for scan.py worker processes: same retries and breaker, no hedging."""
+
+    def __init__(self, url, api_key, connect_timeout=5.0, read_timeout=30.0, retry=None, breaker=None):
+        self.url = url
+        self.api_key = api_key
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self._client = httpx.Client(timeout=httpx.Timeout(read_timeout, connect=connect_timeout))
+
+    def close(self):
+        self._client.close()
+
+    def chat(self, payload):
+        attempts = _CallAttempts(self.retry, self.breaker)
+        headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+        while True:
+            try:
+                resp = self._client.post(self.url, headers=headers, json=payload)
+            except httpx.HTTPError as e:
+                error = _transport_error(e)
+            else:
+                if resp.status_code == 200:
+                    attempts.succeeded()
+                    return _content(resp.json())
+                error = _status_error(resp, resp.text)
+            time.sleep(attempts.failed(error))
@@ -0,0 +1,222 @@
+"""
+Parsing and validation of the Groq threat-analysis reply (ai_result).
+
+The analysis payload asks for JSON mode, so the reply is normally a bare
+JSON object and one json.loads is enough. Otherwise (prose around the
+object, a code fence) the object is located with JSONDecoder.raw_decode
+from the first few "{" positions, which parses forward once per attempt
+instead of regex-matching the whole completion. Replies over
+MAX_REPLY_CHARS are rejected outright, so a runaway completion costs
+bounded time.
+
+The decoded object is validated against AIResult: threat_type is mapped
+onto the known classes, numbers are coerced and clamped, strings are
+capped in length and unknown keys are dropped. Outcomes are counted in
+metrics as llm.parse.*.
+"""
+import json
+import re
+from typing import List
+
+from pydantic import BaseModel, ValidationError, field_validator
+
+import metrics
+
+THREAT_TYPES = ("Phishing", "Malware", "Ransomware", "SQL Injection", "DDoS", "Spam", "Legitimate")
+UNKNOWN_THREAT = "Unknown"
+# Longest reply that is parsed at all; a normal ai_result is well under 4 KB
+MAX_REPLY_CHARS = 64 * 1024
+# "{" positions tried before giving up on a reply that is not bare JSON
+MAX_DECODE_ATTEMPTS = 8
+MAX_TEXT_CHARS = 2000
+MAX_PRECAUTIONS = 10
+
+_decoder = json.JSONDecoder()
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+# Normalized spelling -> class. Keys are lowercase with non-alphanumerics removed.
+THREAT_ALIASES = {
+    **{_NON_ALNUM.sub("", t.lower()): t for t in THREAT_TYPES},
+    "phish": "Phishing", "spearphishing": "Phishing", "smishing": "Phishing", "vishing": "Phishing",
+    "credentialphishing": "Phishing",
+    "virus": "Malware", "trojan": "Malware", "worm": "Malware", "spyware": "Malware",
+    "ransom": "Ransomware", "ransomwareattack": "Ransomware",
+    "sqli": "SQL Injection", "sql": "SQL Injection", "sqlinjectionattack": "SQL Injection",
+    "dos": "DDoS", "denialofservice": "DDoS", "ddosattack": "DDoS",
+    "junk": "Spam", "scam": "Spam",
+    "safe": "Legitimate", "benign": "Legitimate", "clean": "Legitimate", "none": "Legitimate",
+    "notathreat": "Legitimate", "nothreat": "Legitimate",
+}
+
+
+def normalize_threat_type(value):
+    """Map a free-form label onto THREAT_TYPES; UNKNOWN_THREAT if nothing fits."""
+    if value is None:
+        return UNKNOWN_THREAT
+    key = _NON_ALNUM.sub("", str(value).lower())
+    if key in THREAT_ALIASES:
+        return THREAT_ALIASES[key]
+    # "Phishing / Credential Theft", "Possible ransomware", ... but not
+    # "Not legitimate": a partial match never means Legitimate
+    for alias, threat in THREAT_ALIASES.items():
+        if threat != "Legitimate" and len(alias) >= 4 and alias in key:
+            return threat
+    return UNKNOWN_THREAT
+
+
+def _text(value):
+    if value is None:
+        return ""
+    if not isinstance(value, str):
+        value = json.dumps(value) if isinstance(value, (dict, list)) else str(value)
+    return value[:MAX_TEXT_CHARS]
+
+
+class AttackFlow(BaseModel):
+    source: str = ""
+    vulnerability: str = ""
+    impact: str = ""
+
+    @field_validator("source", "vulnerability", "impact", mode="before")
+    @classmethod
+    def _cap(cls, v):
+        return _text(v)
+
+
+class AIResult(BaseModel):
+    threat_type: str
+    confidence: float = 0.0
+    spam_score: int = 0
+    explanation: str = ""
+    caution: str = ""
+    precautions: List[str] = []
+    solution: str = ""
+    attack_flow: AttackFlow = AttackFlow()
+
+    @field_validator("threat_type", mode="before")
+    @classmethod
+    def _threat_type(cls, v):
+        return normalize_threat_type(v)
+
+    @field_validator("confidence", mode="before")
+    @classmethod
+    def _confidence(cls, v):
+        v = float(str(v).rstrip("%")) if isinstance(v, str) else float(v)
+        # Some replies give a percentage
+        if v > 1:
+            v /= 100
+        return min(max(v, 0.0), 1.0)
+
+    @field_validator("spam_score", mode="before")
+    @classmethod
+    def _spam_score(cls, v):
+        v = float(str(v).rstrip("%")) if isinstance(v, str) else float(v)
+        return int(round(min(max(v, 0.0), 100.0)))
+
+    @field_validator("explanation", "caution", "solution", mode="before")
+    @classmethod
+    def _cap(cls, v):
+        return _text(v)
+
+    @field_validator("precautions", mode="before")
+    @classmethod
+    def _precautions(cls, v):
+        if v is None:
+            return []
+        if isinstance(v, str):
+            v = [v]
+        return [_text(p) for p in list(v)[:MAX_PRECAUTIONS]]
+
+    @field_validator("attack_flow", mode="before")
+    @classmethod
+    def _attack_flow(cls, v):
+        return v if isinstance(v, dict) else {}
+
+
+def find_json_object(content):
+    """First decodable JSON object in content, or None. Bounded by MAX_DECODE_ATTEMPTS."""
+    stripped = content.strip()
+    if stripped.startswith("{"):
+        try:
+            obj = json.loads(stripped)
+            if isinstance(obj, dict):
+                return obj
+        except ValueError:
+            pass
+    start = content.find("{")
+    for _ in range(MAX_DECODE_ATTEMPTS):
+        if start < 0:
+            break
+        try:
+            obj, _ = _decoder.raw_decode(content, start)
+            if isinstance(obj, dict):
+                return obj
+        except ValueError:
+            pass
+        start = content.find("{", start + 1)
+    return None
+
+
+def _failed(reason):
+    metrics.inc("llm.parse.failed")
+    metrics.inc(f"llm.parse.{reason}")
+    return None
+
+
+def parse_ai_result(content):
+    """
+    Validated ai_result dict from a completion, or None. Every call counts
+    llm.parse.attempts; failures also count llm.parse.failed and one of
+    llm.parse.too_large / no_json / invalid.
+    """
+    metrics.inc("llm.parse.attempts")
+    if not isinstance(content, str):
+        return _failed("invalid")
+    if len(content) > MAX_REPLY_CHARS:
+        return _failed("too_large")
+    obj = find_json_object(content)
+    if obj is None:
+        return _failed("no_json")
+    try:
+        result = AIResult.model_validate(obj)
+    except (ValidationError, ValueError, TypeError):
+        return _failed("invalid")
+    metrics.inc("llm.parse.ok")
+    if result.threat_type == UNKNOWN_THREAT:
+        metrics.inc("llm.parse.unknown_threat_type")
+    return result.model_dump()
+
+
+def parse_ai_batch(content, ids):
+    """
+    Per-id results from a batched reply ({"results": [{"id": ..., ...}]}):
+    a dict id -> validated ai_result for every id that parsed. Ids missing
+    or invalid in the reply are left out for the caller to retry singly.
+    Counts llm.parse.batch_* alongside the single-reply counters.
+    """
+    metrics.inc("llm.parse.batch_attempts")
+    if not isinstance(content, str) or len(content) > MAX_REPLY_CHARS * len(ids):
+        metrics.inc("llm.parse.batch_failed")
+        return {}
+    obj = find_json_object(content)
+    entries = obj.get("results") if isinstance(obj, dict) else None
+    if not isinstance(entries, list):
+        metrics.inc("llm.parse.batch_failed")
+        return {}
+    wanted = set(ids)
+    results = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        item_id = entry.get("id")
+        if isinstance(item_id, str) and item_id.isdigit():
+            item_id = int(item_id)
+        if item_id not in wanted or item_id in results:
+            continue
+        try:
+            results[item_id] = AIResult.model_validate(entry).model_dump()
+        except (ValidationError, ValueError, TypeError):
+            continue
+    if len(results) < len(wanted):
+        metrics.inc("llm.parse.batch_incomplete")
+    return results
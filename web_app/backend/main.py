@@ -1,17 +1,50 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, Header, HTTPException, Request
+from pydantic import BaseModel, Field, field_validator
 from fastapi.middleware.cors import CORSMiddleware
-import pickle
+from fastapi.responses import JSONResponse, StreamingResponse
 import os
-import numpy as np
-import pandas as pd
-import requests
+import asyncio
+import hmac
 import json
-import re
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
+from analysis import (
+    DEFAULT_DATASET_PATH, load_model_artifacts, load_signature_dataset, file_digest,
+    dataset_verdict, ml_verdicts, build_analysis_payload
+)
+from keywords import KeywordEngine
+from model_store import (
+    compile_forest, export_lock, export_shared, is_forest, load_shared, read_meta as read_shared_meta
+)
+from chat_history import MAX_CONTENT_CHARS, ChatHistoryManager, ChatMessage
+from llm_output import parse_ai_result
+from llm_batcher import LLMBatcher
+from llm_client import CircuitBreaker, CircuitOpenError, LLMClient, LLMError, RetryPolicy
+import metrics
+import registry
+from result_cache import ResultCache, cache_key
+from singleflight import SingleFlight
+from ingest import DuplexStreamingResponse, micro_batches
 
 # --- CONFIGURATION ---
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    await start_http_client()
+    # Load resources off the event loop so the server accepts connections
+    # (and answers /healthz) straight away
+    loader = asyncio.create_task(asyncio.to_thread(load_resources))
+    watcher = asyncio.create_task(watch_resources(RELOAD_WATCH_INTERVAL)) if RELOAD_WATCH_INTERVAL > 0 else None
+    yield
+    for task in (loader, watcher):
+        if task is not None and not task.done():
+            task.cancel()
+    await stop_http_client()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -33,36 +66,116 @@ if not os.getenv("GROQ_API_KEY"):
         load_dotenv(relative_frontend_path)
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY") or os.getenv("VITE_GROQ_API_KEY")
+GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+GROQ_CONNECT_TIMEOUT = float(os.getenv("GROQ_CONNECT_TIMEOUT", "5"))
+GROQ_READ_TIMEOUT = float(os.getenv("GROQ_READ_TIMEOUT", "30"))
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "32"))
+# Failure handling for Groq calls (llm_client.py): retries on 429/5xx within
+# GROQ_CALL_DEADLINE seconds, a circuit breaker that fails calls fast for
+# GROQ_BREAKER_RESET seconds after GROQ_BREAKER_FAILURES consecutive failures,
+# and GROQ_HEDGE=1 to race a second request once a call passes the recent p95
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "2"))
+GROQ_BACKOFF_BASE = float(os.getenv("GROQ_BACKOFF_BASE", "0.25"))
+GROQ_BACKOFF_MAX = float(os.getenv("GROQ_BACKOFF_MAX", "4"))
+GROQ_CALL_DEADLINE = float(os.getenv("GROQ_CALL_DEADLINE", "45"))
+GROQ_BREAKER_FAILURES = int(os.getenv("GROQ_BREAKER_FAILURES", "5"))
+GROQ_BREAKER_RESET = float(os.getenv("GROQ_BREAKER_RESET", "30"))
+GROQ_HEDGE = os.getenv("GROQ_HEDGE", "0") == "1"
+# Micro-batching of /analyze's Groq calls (llm_batcher.py): requests within
+# ANALYZE_LLM_BATCH_WINDOW_MS of each other share one batched prompt of up to
+# ANALYZE_LLM_BATCH_MAX messages. 0 (default) sends one call per request.
+# Batching puts texts from different callers into one prompt, so a crafted
+# message could try to influence the verdicts of the others in its batch.
+# Batches are limited to one message_type and the prompt marks each message
+# as untrusted data, but leave this off where callers don't trust each other.
+ANALYZE_LLM_BATCH_WINDOW_MS = float(os.getenv("ANALYZE_LLM_BATCH_WINDOW_MS", "0"))
+ANALYZE_LLM_BATCH_MAX = int(os.getenv("ANALYZE_LLM_BATCH_MAX", "8"))
 
-# --- DATA & MODELS ---
-MITIGATIONS = {
-    'Phishing': {
-        'Caution': "Do NOT click any links or download attachments. The sender identity is likely spoofed.",
-        'Precautions': ["Verify sender email address carefully.", "Hover over links to see the actual URL.", "Enable multi-factor authentication (MFA)."],
-        'Solution': "Report the email to IT Security immediately. Isolate the affected machine if a link was clicked. Reset credentials."
-    },
-    'Malware': {
-        'Caution': "Malicious software detected. It may be stealing data or damaging system files.",
-        'Precautions': ["Disconnect the device from the network immediately.", "Do not login to sensitive accounts.", "Ensure backup drives are disconnected."],
-        'Solution': "Run a full system scan using Endpoint Detection & Response (EDR) tools. Reimage the machine if persistence is confirmed."
-    },
-    'DDoS': {
-        'Caution': "Network traffic spike detected. Services may become unavailable.",
-        'Precautions': ["Monitor bandwidth usage.", "Identify source IPs.", "Prepare to scale resources."],
-        'Solution': "Activate DDoS mitigation services (e.g., Cloudflare, AWS Shield). Block malicious IP ranges at the firewall."
-    },
-    'Ransomware': {
-        'Caution': "⚠️ CRITICAL: Files are being encrypted. Do NOT pay the ransom.",
-        'Precautions': ["Isolate the infected host immediately.", "Check for 'vshadow' deletion commands.", "Verify backup integrity."],
-        'Solution': "Disconnect network. Identify the strain using ID-Ransomware. Restore from offline backups. Patch the entry vector (e.g., RDP)."
-    },
-    'SQL Injection': {
-        'Caution': "Database integrity at risk. Attacker may be dumping data.",
-        'Precautions': ["Check database logs for query anomalies.", "Monitor for data exfiltration."],
-        'Solution': "Sanitize all user inputs. Use Prepared Statements (Parameterized Queries). Patch vulnerable input fields immediately."
-    }
-}
+# Optional per-stage deadline for /analyze in seconds (0 = wait for every stage)
+STAGE_DEADLINE = float(os.getenv("ANALYZE_STAGE_DEADLINE", "0")) or None
+# Tiered mode: only call the LLM when local signals are weak or disagree.
+# "off" runs all three stages concurrently on every request.
+TIER_MODE = os.getenv("ANALYZE_TIER_MODE", "off").lower()
+TIER_DATASET_CONFIDENCE = float(os.getenv("TIER_DATASET_CONFIDENCE", "0.95"))
+# Keyword-heuristic verdicts vote on their own threshold: they report up to
+# 0.99 after a few keyword hits, which is not an exact signature match. The
+# default (1.0) leaves the dataset vote to exact matches only.
+TIER_HEURISTIC_CONFIDENCE = float(os.getenv("TIER_HEURISTIC_CONFIDENCE", "1.0"))
+TIER_ML_CONFIDENCE = float(os.getenv("TIER_ML_CONFIDENCE", "0.8"))
+# /analyze result cache (ANALYZE_CACHE_ENTRIES=0 disables it)
+ANALYZE_CACHE_ENTRIES = int(os.getenv("ANALYZE_CACHE_ENTRIES", "1024"))
+ANALYZE_CACHE_MAX_MB = float(os.getenv("ANALYZE_CACHE_MAX_MB", "64"))
+ANALYZE_CACHE_TTL = float(os.getenv("ANALYZE_CACHE_TTL", "3600"))
+ANALYZE_CACHE_DB = os.getenv("ANALYZE_CACHE_DB", "")
+ANALYZE_CACHE_DB_MAX_ROWS = int(os.getenv("ANALYZE_CACHE_DB_MAX_ROWS", "100000"))
+# Upper bound on texts per /analyze/batch call
+ANALYZE_BATCH_MAX = int(os.getenv("ANALYZE_BATCH_MAX", "10000"))
+# Streaming ingest: records per micro-batch and per-line size cap
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+INGEST_MAX_LINE_BYTES = int(os.getenv("INGEST_MAX_LINE_BYTES", str(1024 * 1024)))
+# Model artifacts come from the versioned registry (registry.py; MODEL_VERSION
+# pins a version, else model/CURRENT). MODEL_DIR serves a plain directory
+# with model.pkl / vectorizer.pkl instead, bypassing the registry.
+# RELOAD_WATCH_INTERVAL > 0 polls the model and data/ for changes every N seconds.
+MODEL_DIR = os.getenv("MODEL_DIR", "")
+# "flat" compiles the unpickled forest into flat node arrays scored all
+# trees at once (model_store.py); "pickle" keeps sklearn's predict_proba;
+# "shared" memory-maps a flat export so N workers share one copy of the trees
+MODEL_SERVING = os.getenv("MODEL_SERVING", "flat").lower()
+# Defaults to <model dir>/shared
+SHARED_MODEL_DIR = os.getenv("SHARED_MODEL_DIR", "")
+RELOAD_WATCH_INTERVAL = float(os.getenv("RELOAD_WATCH_INTERVAL", "0"))
+# Required (X-Admin-Token header) by /admin/reload, /patterns/reload and
+# /cache/invalidate; unset disables all three
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+# /chat prompt budget in (approximate) tokens: system prompt + history + message,
+# with CHAT_REPLY_RESERVE left for the reply. Older turns that do not fit are
+# condensed into a short summary; single turns are capped at CHAT_MAX_MESSAGE_TOKENS.
+CHAT_PROMPT_BUDGET = int(os.getenv("CHAT_PROMPT_BUDGET", "3000"))
+CHAT_MAX_MESSAGE_TOKENS = int(os.getenv("CHAT_MAX_MESSAGE_TOKENS", "600"))
+CHAT_SUMMARY_TOKENS = int(os.getenv("CHAT_SUMMARY_TOKENS", "200"))
+CHAT_REPLY_RESERVE = int(os.getenv("CHAT_REPLY_RESERVE", "512"))
+# Turns considered at all (older ones are ignored); the budget decides what is sent
+CHAT_MAX_HISTORY = int(os.getenv("CHAT_MAX_HISTORY", "200"))
+# Worker threads for the CPU-bound dataset and ML stages
+cpu_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("ANALYZE_CPU_WORKERS", str(min(8, os.cpu_count() or 1)))),
+    thread_name_prefix="analyze"
+)
+
+# --- HTTP CLIENT ---
+# One pooled Groq client for the whole app (llm_client.py): keeps connections
+# alive, caps in-flight calls, retries, and fails fast while Groq is down.
+llm = None
+llm_batcher = None
+
+async def start_http_client():
+    global llm, llm_batcher
+    llm = LLMClient(
+        GROQ_API_URL,
+        GROQ_API_KEY,
+        connect_timeout=GROQ_CONNECT_TIMEOUT,
+        read_timeout=GROQ_READ_TIMEOUT,
+        max_concurrency=GROQ_MAX_CONCURRENCY,
+        retry=RetryPolicy(GROQ_MAX_RETRIES, GROQ_BACKOFF_BASE, GROQ_BACKOFF_MAX, GROQ_CALL_DEADLINE),
+        breaker=CircuitBreaker(GROQ_BREAKER_FAILURES, GROQ_BREAKER_RESET),
+        hedge=GROQ_HEDGE,
+    )
+    await llm.start()
+    if ANALYZE_LLM_BATCH_WINDOW_MS > 0:
+        llm_batcher = LLMBatcher(llm, ANALYZE_LLM_BATCH_WINDOW_MS / 1000, ANALYZE_LLM_BATCH_MAX)
+
+async def stop_http_client():
+    global llm, llm_batcher
+    if llm_batcher is not None:
+        # Batches still waiting on Groq need the client open
+        await llm_batcher.aclose()
+        llm_batcher = None
+    if llm is not None:
+        await llm.aclose()
+        llm = None
 
+# --- DATA & MODELS ---
 GRAPH_NODES = {
     'Phishing': {'src': 'Attacker (Email)', 'vuln': 'Human Element', 'impact': 'Credential Theft'},
     'Malware': {'src': 'C2 Server', 'vuln': 'Unpatched Software', 'impact': 'System Compromise'},
@@ -71,74 +184,212 @@ GRAPH_NODES = {
     'SQL Injection': {'src': 'Web Client', 'vuln': 'Input Fields', 'impact': 'Database Leak'}
 }
 
+class Resources:
+    """
+    One immutable generation of model + signature data. Requests grab the
+    current generation once and use it throughout, so a reload swapping in
+    a new one never mixes versions inside a request.
+    """
+
+    def __init__(self, model=None, vectorizer=None, dataset_df=None, signature_index=None,
+                 model_version="none", dataset_version="none"):
+        self.model = model
+        self.vectorizer = vectorizer
+        self.dataset_df = dataset_df
+        self.signature_index = signature_index
+        self.model_version = model_version
+        self.dataset_version = dataset_version
+
+    @property
+    def version(self):
+        return f"model:{self.model_version}+data:{self.dataset_version}"
+
 # Global Resources
-model = None
-vectorizer = None
-dataset_df = None
+resources = Resources()
+keyword_engine = KeywordEngine()
+result_cache = ResultCache(
+    max_entries=ANALYZE_CACHE_ENTRIES,
+    max_bytes=int(ANALYZE_CACHE_MAX_MB * 1024 * 1024),
+    ttl=ANALYZE_CACHE_TTL,
+    db_path=ANALYZE_CACHE_DB or None,
+    db_max_rows=ANALYZE_CACHE_DB_MAX_ROWS
+)
+analysis_flights = SingleFlight()
 
-def load_resources():
-    global model, vectorizer, dataset_df
-    
-    # 1. Load ML Model
-    try:
-        model_path = os.path.join("model", "model.pkl")
-        vec_path = os.path.join("model", "vectorizer.pkl")
-        if os.path.exists(model_path) and os.path.exists(vec_path):
-            with open(model_path, "rb") as f:
-                model = pickle.load(f)
-            with open(vec_path, "rb") as f:
-                vectorizer = pickle.load(f)
-            print("ML Model loaded successfully.")
-        else:
-            print("ML Model files not found.")
-    except Exception as e:
-        print(f"Error loading ML model: {e}")
+# Per-resource load state for /readyz: pending -> loading -> ready | missing | error
+RESOURCE_STATUS = {name: {"state": "pending"} for name in ("model", "dataset", "keywords")}
+RELOAD_STATUS = {"generation": 0, "last_reload": None, "last_error": None}
+_reload_lock = threading.Lock()
 
-    # 2. Load Excel Dataset
+def _track_load(name, loader, initial):
+    # On the first load report progress; on reloads keep the old state
+    # visible (it is still serving) until the new one is in place
+    if initial:
+        RESOURCE_STATUS[name] = {"state": "loading"}
+    t0 = time.perf_counter()
     try:
-        # Path: web_app/backend/../../data/cyber_threat_dataset.xlsx
-        dataset_path = os.path.join(os.path.dirname(__file__), "..", "..", "data", "cyber_threat_dataset.xlsx")
-        dataset_path = os.path.normpath(dataset_path)
-        
-        if os.path.exists(dataset_path):
-            dataset_df = pd.read_excel(dataset_path)
-            # Preprocess: lowercase the text column for case-insensitive searching
-            if 'threat_text' in dataset_df.columns:
-                dataset_df['threat_text'] = dataset_df['threat_text'].astype(str).str.lower()
-            print(f"Dataset loaded: {len(dataset_df)} records.")
-        else:
-            print(f"Dataset not found at {dataset_path}")
+        state, detail = loader()
     except Exception as e:
-        print(f"Error loading dataset: {e}")
+        print(f"Error loading {name}: {e}")
+        state, detail = "error", str(e)
+    status = {"state": state, "seconds": round(time.perf_counter() - t0, 3), "detail": detail}
+    if initial or state != "error":
+        RESOURCE_STATUS[name] = status
+    return status
+
+def load_resources():
+    """
+    Build a new Resources generation off the request path and swap it in.
+    Blocking; runs in a background thread at startup and on reload. If a
+    reload fails, the previous generation keeps serving.
+    """
+    global resources
+    with _reload_lock:
+        initial = RELOAD_STATUS["generation"] == 0
+        new = Resources()
+
+        def load_model():
+            if MODEL_DIR:
+                model_dir = MODEL_DIR
+                model_path = os.path.join(MODEL_DIR, "model.pkl")
+                vec_path = os.path.join(MODEL_DIR, "vectorizer.pkl")
+                if not (os.path.exists(model_path) and os.path.exists(vec_path)):
+                    print("ML Model files not found.")
+                    return "missing", "model.pkl / vectorizer.pkl not found"
+                new.model_version = file_digest(model_path, vec_path)
+            else:
+                try:
+                    # Checksums are verified before anything is unpickled
+                    entry = registry.resolve()
+                    registry.verify(entry)
+                except registry.RegistryError as e:
+                    if not initial and resources.model is not None:
+                        # A corrupt or unknown version must not replace a working model
+                        raise
+                    print(f"ML Model not available: {e}")
+                    return "missing", str(e)
+                model_dir = entry.path
+                new.model_version = entry.version
+            if MODEL_SERVING == "shared":
+                new.model, new.vectorizer = load_shared_model(model_dir, new.model_version)
+            else:
+                new.model, new.vectorizer = load_model_artifacts(model_dir)
+                if MODEL_SERVING == "flat":
+                    new.model = compile_forest(new.model)
+            print(f"ML Model loaded successfully (version {new.model_version}, {MODEL_SERVING} mode).")
+            return "ready", f"{type(new.model).__name__} {new.model_version}"
+
+        def load_dataset():
+            new.dataset_df, new.signature_index = load_signature_dataset(DEFAULT_DATASET_PATH)
+            if new.dataset_df is None:
+                print(f"Dataset not found at {DEFAULT_DATASET_PATH}")
+                return "missing", f"not found at {DEFAULT_DATASET_PATH}"
+            new.dataset_version = file_digest(DEFAULT_DATASET_PATH)
+            if new.signature_index is not None:
+                print(f"Signature index built: {len(new.signature_index)} signatures ({new.signature_index.backend}).")
+            print(f"Dataset loaded: {len(new.dataset_df)} records.")
+            return "ready", f"{len(new.dataset_df)} records {new.dataset_version}"
+
+        def load_keywords():
+            info = keyword_engine.reload()
+            print(f"Keyword engine compiled: {info['patterns']} patterns, packs: {info['packs'] or 'none'}.")
+            return "ready", f"{info['patterns']} patterns"
+
+        # 1. Load ML Model
+        model_status = _track_load("model", load_model, initial)
+        # 2. Load Excel Dataset
+        dataset_status = _track_load("dataset", load_dataset, initial)
+        # 3. Heuristic keyword packs
+        _track_load("keywords", load_keywords, initial)
+
+        failed = [
+            f"{n} ({st['detail']})" for n, st in (("model", model_status), ("dataset", dataset_status))
+            if st["state"] == "error"
+        ]
+        if failed and not initial:
+            RELOAD_STATUS["last_error"] = f"reload failed for {', '.join(failed)}; keeping {resources.version}"
+            print(RELOAD_STATUS["last_error"])
+            return resources
+
+        # Atomic swap: in-flight requests keep the generation they started with
+        old_version = resources.version
+        resources = new
+        RELOAD_STATUS["generation"] += 1
+        RELOAD_STATUS["last_reload"] = time.time()
+        RELOAD_STATUS["last_error"] = None
+        if not initial and new.version != old_version:
+            # Cached verdicts came from the old model / signatures
+            result_cache.invalidate()
+        return new
+
+def load_shared_model(model_dir, version):
+    """
+    Memory-mapped forest shared by all workers. Exports it from the pickles
+    first if the export is missing or was made from a different model; the
+    lock makes workers starting together export once and map the same files.
+    """
+    shared_dir = SHARED_MODEL_DIR or os.path.join(model_dir, "shared")
+    with export_lock(shared_dir):
+        meta = read_shared_meta(shared_dir)
+        if meta is None or meta.get("source_version") != version:
+            model, vectorizer = load_model_artifacts(model_dir)
+            if not is_forest(model):
+                print(f"{type(model).__name__} has no flat export; serving the pickle.")
+                return model, vectorizer
+            export_shared(model, vectorizer, shared_dir, source_version=version)
+            print(f"Exported shared model to {shared_dir}")
+        return load_shared(shared_dir)
 
-load_resources()
+def resources_loading():
+    return [name for name, info in RESOURCE_STATUS.items() if info["state"] in ("pending", "loading")]
+
+def watched_mtimes():
+    if MODEL_DIR:
+        paths = [os.path.join(MODEL_DIR, "model.pkl"), os.path.join(MODEL_DIR, "vectorizer.pkl")]
+    else:
+        # Publishing or `registry.py use` moves the CURRENT pointer
+        paths = [os.path.join(registry.REGISTRY_DIR, registry.CURRENT)]
+    paths.append(DEFAULT_DATASET_PATH)
+    return tuple(os.path.getmtime(p) if os.path.exists(p) else None for p in paths)
+
+async def watch_resources(interval):
+    """Poll the model and data/ and reload when an artifact changes."""
+    last = watched_mtimes()
+    while True:
+        await asyncio.sleep(interval)
+        current = watched_mtimes()
+        if current != last:
+            last = current
+            print("Model or dataset changed on disk, reloading...")
+            await asyncio.to_thread(load_resources)
 
 # --- REQUEST MODEL ---
 class AnalysisRequest(BaseModel):
     text: str
     message_type: str = "email"
+    stage_deadline: Optional[float] = None
+
+class BatchAnalysisRequest(BaseModel):
+    texts: List[str]
+    message_type: str = "email"
+
+class CacheInvalidateRequest(BaseModel):
+    text: Optional[str] = None
+    message_type: str = "email"
 
 class ChatRequest(BaseModel):
-    message: str
-    history: list = []
+    message: str = Field(max_length=MAX_CONTENT_CHARS)
+    history: List[ChatMessage] = []
 
-# --- ENDPOINTS ---
-@app.post("/chat")
-async def chat_with_bot(request: ChatRequest):
-    """
-    Chatbot endpoint using Groq API.
-    Context: Expert on the current Website (ThreatNet) and Phishing detection.
-    """
-    if not GROQ_API_KEY:
-        raise HTTPException(status_code=500, detail="Groq API Key not configured")
+    @field_validator("history", mode="before")
+    @classmethod
+    def _newest_turns(cls, v):
+        # The widget resends the whole conversation; keep the newest turns
+        # rather than rejecting long chats (the token budget trims further)
+        return v[-CHAT_MAX_HISTORY:] if isinstance(v, list) else v
 
-    try:
-        headers = {
-            "Authorization": f"Bearer {GROQ_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        system_prompt = """You are 'Cute Bot', the official AI Assistant for ThreatNet (this website).
+# --- ENDPOINTS ---
+CHAT_SYSTEM_PROMPT = """You are 'Cute Bot', the official AI Assistant for ThreatNet (this website).
         
         YOUR ROLE:
         1. Expert in Phishing Detection and Cyber Threat Intelligence (CTI).
@@ -154,175 +405,437 @@ async def chat_with_bot(request: ChatRequest):
         - Friendly, helpful, professional, and slightly cute/enthusiastic.
         - You live in the bottom-right corner of the screen!
         """
-        
-        messages = [{"role": "system", "content": system_prompt}]
-        
-        # Append history (limit to last 6 messages to save context window)
-        messages.extend(request.history[-6:])
-        
-        # Append current message
-        messages.append({"role": "user", "content": request.message})
-        
-        payload = {
-            "model": "llama-3.3-70b-versatile",
-            "messages": messages,
-            "temperature": 0.7
-        }
-        
-        resp = requests.post("https://api.groq.com/openai/v1/chat/completions", headers=headers, json=payload)
-        
-        if resp.status_code == 200:
-            return {"reply": resp.json()['choices'][0]['message']['content']}
-        else:
-             raise HTTPException(status_code=resp.status_code, detail=f"Groq API Error: {resp.text}")
 
-    except Exception as e:
+chat_history = ChatHistoryManager(
+    CHAT_SYSTEM_PROMPT,
+    budget=CHAT_PROMPT_BUDGET,
+    max_message_tokens=CHAT_MAX_MESSAGE_TOKENS,
+    summary_tokens=CHAT_SUMMARY_TOKENS,
+    reply_reserve=CHAT_REPLY_RESERVE,
+)
+
+def build_chat_payload(request: ChatRequest, stream=False):
+    # Fit system prompt + history + message to the token budget
+    messages, stats = chat_history.build(request.message, request.history)
+    metrics.observe("chat.prompt_tokens", stats["prompt_tokens"])
+    metrics.inc("chat.history.turns_kept", stats["kept"])
+    metrics.inc("chat.history.turns_summarized", stats["summarized"])
+    metrics.inc("chat.history.turns_dropped", stats["dropped"])
+    metrics.inc("chat.history.turns_truncated", stats["truncated"])
+    
+    payload = {
+        "model": "llama-3.3-70b-versatile",
+        "messages": messages,
+        "temperature": 0.7,
+        "max_tokens": CHAT_REPLY_RESERVE
+    }
+    if stream:
+        payload["stream"] = True
+    return payload
+
+@app.post("/chat")
+async def chat_with_bot(request: ChatRequest):
+    """
+    Chatbot endpoint using Groq API.
+    Context: Expert on the current Website (ThreatNet) and Phishing detection.
+    """
+    if not GROQ_API_KEY:
+        raise HTTPException(status_code=500, detail="Groq API Key not configured")
+
+    try:
+        return {"reply": await llm.chat(build_chat_payload(request))}
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except LLMError as e:
         print(f"Chat Error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=502, detail=str(e))
+
+def sse_event(data, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+async def relay_chat_stream(payload, started):
+    """
+    Relay Groq's streamed completion as server-sent events: one
+    `data: {"token": ...}` per delta, then `event: done` with timings.
+    When the client disconnects Starlette cancels this generator; leaving
+    the `async with` closes the upstream connection, so Groq stops
+    generating for a user who has gone.
+    """
+    first_token_at = None
+    tokens = 0
+    try:
+        async with llm.stream(payload) as resp:
+            async for line in resp.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                except (ValueError, KeyError, IndexError):
+                    continue
+                if not delta:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    metrics.observe("chat.stream.ttft", first_token_at - started)
+                tokens += 1
+                yield sse_event({"token": delta})
+    except asyncio.CancelledError:
+        metrics.inc("chat.stream.disconnects")
+        raise
+    except LLMError as e:
+        print(f"Chat Stream Error: {e}")
+        metrics.inc("chat.stream.upstream_errors")
+        yield sse_event({"detail": str(e)}, "error")
+        return
+
+    total = time.perf_counter() - started
+    metrics.observe("chat.stream.duration", total)
+    yield sse_event({
+        "tokens": tokens,
+        "ttft_ms": round((first_token_at - started) * 1000, 1) if first_token_at else None,
+        "total_ms": round(total * 1000, 1),
+    }, "done")
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Streaming /chat: tokens arrive as server-sent events while Groq is still
+    generating, so the first words show up after time-to-first-token instead
+    of after the whole completion.
+    """
+    if not GROQ_API_KEY:
+        raise HTTPException(status_code=500, detail="Groq API Key not configured")
+    metrics.inc("chat.stream.requests")
+    return StreamingResponse(
+        relay_chat_stream(build_chat_payload(request, stream=True), time.perf_counter()),
+        media_type="text/event-stream",
+        # No proxy buffering, or the tokens arrive all at once anyway
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# --- ANALYSIS STAGES ---
+def run_dataset_stage(input_lower, res):
+    """Signature match first, then the keyword heuristic. CPU-bound."""
+    return dataset_verdict(input_lower, res.signature_index, keyword_engine)
+
+def run_ml_batch(texts, res):
+    return ml_verdicts(texts, res.model, res.vectorizer)
+
+def run_ml_stage(input_text, res):
+    """Local RandomForest prediction. CPU-bound."""
+    if not (res.model and res.vectorizer):
+        return None
+    try:
+        return run_ml_batch([input_text], res)[0]
+    except Exception as e:
+        print(f"ML Prediction Error: {e}")
+        return None
+
+def run_local_batch(texts, res):
+    """Dataset + ML stages for a whole batch. CPU-bound."""
+    dataset_results = [run_dataset_stage(t.lower(), res) for t in texts]
+    ml_results = [None] * len(texts)
+    if res.model and res.vectorizer and texts:
+        try:
+            ml_results = run_ml_batch(texts, res)
+        except Exception as e:
+            print(f"ML Batch Prediction Error: {e}")
+    return [
+        {"dataset_result": d, "ml_result": m, "ai_result": None}
+        for d, m in zip(dataset_results, ml_results)
+    ]
+
+async def run_ai_stage(input_text, message_type):
+    """Groq LLM analysis. I/O-bound, runs on the event loop."""
+    if not GROQ_API_KEY:
+        return None
+    try:
+        if llm_batcher is not None:
+            return await llm_batcher.submit(input_text, message_type)
+        content = await llm.chat(build_analysis_payload(input_text, message_type))
+        return parse_ai_result(content)
+    except CircuitOpenError:
+        # Groq is down: skip straight to the local verdict (counted in llm.rejected)
+        pass
+    except LLMError as e:
+        print(f"Groq API Error: {e}")
+    except (ValueError, KeyError, IndexError) as e:
+        # Not a chat-completions body at all; bad ai_result JSON is counted in llm.parse.*
+        print(f"Groq response unusable: {e}")
+    return None
+
+async def await_stage(name, awaitable, deadline, stages):
+    """Await one stage, recording status and duration. Returns None on timeout or error."""
+    t0 = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(awaitable, timeout=deadline)
+        stages[name] = {"status": "ok", "ms": round((time.perf_counter() - t0) * 1000, 2)}
+        return result
+    except asyncio.TimeoutError:
+        stages[name] = {"status": "timed_out", "ms": round((time.perf_counter() - t0) * 1000, 2)}
+    except Exception as e:
+        print(f"{name} stage error: {e}")
+        stages[name] = {"status": "error", "ms": round((time.perf_counter() - t0) * 1000, 2)}
+    return None
+
+def decide_tier(dataset_result, ml_result):
+    """
+    Tiered policy. A local signal votes only when it clears its confidence
+    threshold. Returns (tier, reason); tier is None when the LLM is needed.
+    """
+    votes = {}
+    if dataset_result:
+        exact = dataset_result.get("method") == "Dataset (Exact Match)"
+        threshold = TIER_DATASET_CONFIDENCE if exact else TIER_HEURISTIC_CONFIDENCE
+        if dataset_result["confidence"] >= threshold:
+            votes["dataset"] = dataset_result["threat_type"]
+    if ml_result and ml_result["confidence"] >= TIER_ML_CONFIDENCE:
+        votes["ml"] = ml_result["prediction"]
+
+    if not votes:
+        return None, "local confidence below threshold"
+    if len(set(votes.values())) > 1:
+        return None, f"dataset ({votes['dataset']}) and ML ({votes['ml']}) disagree"
+    tier = "dataset" if "dataset" in votes else "ml"
+    return tier, f"{tier} confident ({next(iter(votes.values()))})"
 
 @app.post("/analyze")
 async def analyze_threat(request: AnalysisRequest):
     """
     Combined analysis: Dataset check + ML local model + Groq AI fallback/enhancement.
+    Results are cached by exact text + message_type + resource generation.
+    """
+    metrics.inc("analyze.requests")
+    key = cache_key(request.text, request.message_type, resources.version)
+    cached = await result_cache.aget(key)
+    if cached is not None:
+        metrics.inc("analyze.cache.hit")
+        return {**cached, "cache": "hit"}
+    metrics.inc("analyze.cache.miss")
+
+    async def compute_and_store():
+        response_data = await compute_analysis(request)
+        if response_data["degraded"]:
+            return response_data
+        # Partial results (timeouts, stage errors, a failed Groq call) are not worth replaying
+        complete = all(info["status"] in ("ok", "skipped") for info in response_data["stages"].values())
+        ai_done = response_data["ai_result"] is not None or response_data["stages"]["ai"]["status"] == "skipped"
+        if complete and (ai_done or not GROQ_API_KEY):
+            # Keyed by the generation that actually computed it (a reload may have swapped in between)
+            await result_cache.aset(
+                cache_key(request.text, request.message_type, response_data["model_version"]), response_data
+            )
+        return response_data
+
+    # Identical requests arriving while this one is running wait on it
+    # (the deadline is part of the key so callers only share like-for-like work)
+    flight_key = (key, request.stage_deadline, resources.version)
+    response_data, shared = await analysis_flights.do(flight_key, compute_and_store)
+    if shared:
+        metrics.inc("analyze.coalesced")
+        return {**response_data, "cache": "coalesced"}
+    return {**response_data, "cache": "miss"}
+
+async def compute_analysis(request):
+    """
+    The three stages run concurrently (CPU stages on the worker pool), so the
+    response takes about as long as the slowest one. With a stage deadline
+    set, a late stage is reported as timed out and the rest is returned.
+    In tiered mode the local stages run first and Groq is only called when
+    they are not confident enough or disagree.
     """
-    response_data = {
-        "dataset_result": None,
-        "ai_result": None,
-        "ml_result": None
-    }
-    
     input_text = request.text
     input_lower = input_text.lower()
-    
-    # 1. DATASET CHECK
-    dataset_match = None
-    if dataset_df is not None and 'threat_text' in dataset_df.columns:
-        for _, row in dataset_df.iterrows():
-            threat_txt = str(row['threat_text']).lower()
-            if len(threat_txt) > 4 and threat_txt in input_lower:
-                dataset_match = {
-                    "threat_type": row.get('attack_type', 'Spam'),
-                    "confidence": 0.99,
-                    "spam_score": 95,
-                    "method": "Dataset (Exact Match)",
-                    "matched_patterns": [threat_txt],
-                    "explanation": f"Matched known threat signature from dataset Report ID: {row.get('report_id', 'N/A')}"
-                }
-                break
-    
-    # Failsafe fallback
-    if not dataset_match:
-         spam_patterns = {
-            'Phishing': ['verify account', 'confirm identity', 'urgent action', 'click here', 'suspended account', 'unusual activity', 'verify now', 'confirm password', 'account locked', 'login attempt', 'security alert', 'bank account', 'update information'],
-            'Malware': ['download attachment', 'open file', 'install', '.exe', 'virus', 'infected', 'enable macros', '.zip', '.rar', 'malicious', 'trojan'],
-            'Ransomware': ['bitcoin', 'payment required', 'locked files', 'decrypt', 'ransom', 'encrypted', 'wallet', 'btc', 'pay now'],
-            'Spam': ['win prize', 'congratulations', 'free', 'limited offer', 'act now', 'special promotion', 'winner', 'lottery', 'inheritance', '100% free', 'buy now'],
-            'SQL Injection': ['drop table', 'select *', 'union select', '1=1', 'or 1=1', '--', 'delete from', 'insert into', 'update set'],
-            'DDoS': ['flood', 'overwhelm', 'traffic spike', 'denial of service', 'packet flood', 'botnet']
-        }
-         found_matches = []
-         detected_type = "Legitimate"
-         max_matches = 0
-         for t_type, patterns in spam_patterns.items():
-            matches = [p for p in patterns if p in input_lower]
-            if matches:
-                 if len(matches) > max_matches:
-                    max_matches = len(matches)
-                    detected_type = t_type
-                    found_matches = matches
-         
-         if max_matches > 0:
-            dataset_match = {
-                "threat_type": detected_type,
-                "confidence": min(0.99, 0.7 + (max_matches * 0.1)),
-                "spam_score": min(100, 40 + (max_matches * 20)),
-                "method": "Dataset (Heuristic)",
-                "matched_patterns": found_matches,
-                "explanation": f"Detected suspicious patterns commonly found in {detected_type}: {', '.join(found_matches)}"
-            }
-
-    response_data["dataset_result"] = dataset_match or {
-        "threat_type": "Legitimate",
-        "confidence": 0.0,
-        "spam_score": 0,
-        "method": "Dataset",
-        "explanation": "No matching threat signature found in dataset."
-    }
+    deadline = request.stage_deadline or STAGE_DEADLINE
+    loading = resources_loading()
+    res = resources
 
-    # 2. ML MODEL CHECK (Local)
-    if model and vectorizer:
-        try:
-            vec_text = vectorizer.transform([input_text])
-            prediction = model.predict(vec_text)[0]
-            probs = model.predict_proba(vec_text)[0]
-            confidence = float(max(probs))
-            
-            mitigation_info = MITIGATIONS.get(prediction, {})
-            
-            response_data["ml_result"] = {
-                "prediction": prediction,
-                "confidence": confidence,
-                "mitigation": mitigation_info
-            }
-        except Exception as e:
-            print(f"ML Prediction Error: {e}")
+    loop = asyncio.get_running_loop()
+    stages = {}
+    local_stages = [
+        await_stage("dataset", loop.run_in_executor(cpu_executor, run_dataset_stage, input_lower, res), deadline, stages),
+        await_stage("ml", loop.run_in_executor(cpu_executor, run_ml_stage, input_text, res), deadline, stages),
+    ]
 
-    # 3. GROQ AI CHECK
-    if GROQ_API_KEY:
-        try:
-            headers = {
-                "Authorization": f"Bearer {GROQ_API_KEY}",
-                "Content-Type": "application/json"
-            }
-            
-            system_prompt = """You are a cybersecurity expert. Analyze the user's message for spam and threats.
-            CRITICAL:
-            1. "Hi" or normal chat is SAFE.
-            2. "Verify account", "Bitcoin", "Urgent" are THREATS.
-            3. Return JSON ONLY.
-            """
-            
-            user_prompt = f"""Analyze this {request.message_type} message:
-            "{input_text}"
-            
-            Respond with JSON:
-            {{
-              "threat_type": "Phishing|Malware|Ransomware|SQL Injection|DDoS|Spam|Legitimate",
-              "confidence": 0.95,
-              "spam_score": 85,
-              "explanation": "Reasoning...",
-              "caution": "Warning if any",
-              "precautions": ["Step 1", "Step 2"],
-              "solution": "Fix...",
-              "attack_flow": {{ "source": "...", "vulnerability": "...", "impact": "..." }}
-            }}
-            """
-            
-            payload = {
-                "model": "llama-3.3-70b-versatile",
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                "temperature": 0.3
-            }
-            
-            resp = requests.post("https://api.groq.com/openai/v1/chat/completions", headers=headers, json=payload)
-            if resp.status_code == 200:
-                content = resp.json()['choices'][0]['message']['content']
-                # extract json
-                json_match = re.search(r'\{[\s\S]*\}', content)
-                if json_match:
-                    ai_json = json.loads(json_match.group(0))
-                    response_data["ai_result"] = ai_json
+    if TIER_MODE == "tiered":
+        dataset_result, ml_result = await asyncio.gather(*local_stages)
+        tier, reason = decide_tier(dataset_result, ml_result)
+        ai_result = None
+        if tier is None:
+            ai_result = await await_stage("ai", run_ai_stage(input_text, request.message_type), deadline, stages)
+            if ai_result:
+                tier = "llm"
             else:
-                print(f"Groq API returned {resp.status_code}: {resp.text}")
-                
-        except Exception as e:
-            print(f"Groq API Error: {e}")
+                tier = "ml" if ml_result else "dataset"
+                reason += "; LLM unavailable"
+        else:
+            stages["ai"] = {"status": "skipped", "ms": 0.0}
+    else:
+        dataset_result, ml_result, ai_result = await asyncio.gather(
+            *local_stages,
+            await_stage("ai", run_ai_stage(input_text, request.message_type), deadline, stages),
+        )
+        tier = "llm" if ai_result else ("ml" if ml_result else "dataset")
+        reason = "all stages run"
 
+    metrics.inc("analyze.computed")
+    metrics.inc(f"analyze.tier.{tier}")
+    if stages.get("ai", {}).get("status") == "skipped":
+        metrics.inc("analyze.llm_avoided")
+
+    response_data = {
+        "dataset_result": dataset_result,
+        "ai_result": ai_result,
+        "ml_result": ml_result,
+        "model_version": res.version,
+        # Resources still loading at request time; results may be partial
+        "degraded": loading,
+        "decision": {"tier": tier, "mode": TIER_MODE, "reason": reason},
+        "stages": stages,
+        "timed_out": [name for name, info in stages.items() if info["status"] == "timed_out"]
+    }
     return response_data
 
+@app.post("/analyze/batch")
+async def analyze_batch(request: BatchAnalysisRequest):
+    """
+    Bulk analysis for SIEM exports: signature + heuristic check per text and
+    one vectorized ML pass over the whole batch. Groq is not called here.
+    """
+    if len(request.texts) > ANALYZE_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"Batch too large (max {ANALYZE_BATCH_MAX} texts)")
+
+    t0 = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    res = resources
+    results = await loop.run_in_executor(cpu_executor, run_local_batch, request.texts, res)
+    metrics.inc("analyze.batch.requests")
+    metrics.inc("analyze.batch.texts", len(results))
+    return {
+        "count": len(results),
+        "model_version": res.version,
+        "results": results,
+        "ms": round((time.perf_counter() - t0) * 1000, 2)
+    }
+
+@app.post("/ingest")
+async def ingest_stream(request: Request):
+    """
+    Streaming bulk ingest. The body is NDJSON (objects with "text" and an
+    optional "id") or plain text, one record per line. Records are analyzed
+    in micro-batches with the dataset and ML stages and verdicts are streamed
+    back as NDJSON while the upload is still being read. The body is only
+    pulled as fast as the client reads results, so memory stays flat.
+    """
+    async def verdicts():
+        loop = asyncio.get_running_loop()
+        t0 = time.perf_counter()
+        total = errors = 0
+        async for batch in micro_batches(request.stream(), INGEST_BATCH_SIZE, INGEST_MAX_LINE_BYTES):
+            valid = [r for r in batch if r["error"] is None]
+            # One generation per batch, even if a reload swaps resources meanwhile
+            gen = resources
+            results = await loop.run_in_executor(cpu_executor, run_local_batch, [r["text"] for r in valid], gen)
+            by_line = {r["line"]: result for r, result in zip(valid, results)}
+
+            out = []
+            for r in batch:
+                verdict = {"line": r["line"], "id": r["id"], "model_version": gen.version}
+                if r["error"]:
+                    verdict["error"] = r["error"]
+                    errors += 1
+                else:
+                    result = by_line[r["line"]]
+                    verdict["dataset_result"] = result["dataset_result"]
+                    verdict["ml_result"] = result["ml_result"]
+                out.append(json.dumps(verdict, default=str))
+            total += len(batch)
+            metrics.inc("ingest.records", len(batch))
+            yield "\n".join(out) + "\n"
+
+        elapsed = time.perf_counter() - t0
+        yield json.dumps({"summary": {
+            "records": total,
+            "errors": errors,
+            "seconds": round(elapsed, 3),
+            "records_per_s": round(total / elapsed, 1) if elapsed else 0.0
+        }}) + "\n"
+
+    return DuplexStreamingResponse(verdicts(), media_type="application/x-ndjson")
+
+@app.post("/cache/invalidate")
+def invalidate_cache(request: CacheInvalidateRequest, x_admin_token: Optional[str] = Header(default=None)):
+    """Drop the cached result for one text, or the whole cache when text is omitted. Needs ADMIN_TOKEN."""
+    require_admin(x_admin_token)
+    key = cache_key(request.text, request.message_type, resources.version) if request.text is not None else None
+    return {"removed": result_cache.invalidate(key)}
+
+@app.get("/metrics")
+def get_metrics():
+    return {
+        "counters": metrics.snapshot(),
+        "llm_avoidance_rate": metrics.ratio("analyze.llm_avoided", "analyze.computed"),
+        "cache_hit_rate": metrics.ratio("analyze.cache.hit", "analyze.requests"),
+        "coalesced_rate": metrics.ratio("analyze.coalesced", "analyze.requests"),
+        "inflight_analyses": len(analysis_flights),
+        "chat_prompt_tokens": metrics.summary("chat.prompt_tokens"),
+        "chat_system_prompt_tokens": chat_history.system_tokens,
+        "chat_stream_ttft_s": metrics.summary("chat.stream.ttft"),
+        "chat_stream_duration_s": metrics.summary("chat.stream.duration"),
+        "llm": llm.stats() if llm is not None else None,
+        "llm_parse_failure_rate": metrics.ratio("llm.parse.failed", "llm.parse.attempts"),
+        "llm_batch_size": metrics.summary("llm.batch.size"),
+        "cache": result_cache.stats(),
+    }
+
+def require_admin(token):
+    """
+    Admin endpoints are off unless ADMIN_TOKEN is set: CORS allows any
+    origin, so an open endpoint could be triggered from any web page.
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.post("/patterns/reload")
+def reload_patterns(x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Recompile the heuristic keyword engine with any pattern packs in the
+    patterns directory. No restart required. Needs ADMIN_TOKEN.
+    """
+    require_admin(x_admin_token)
+    try:
+        return keyword_engine.reload()
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Pattern pack error: {e}")
+
+@app.post("/admin/reload")
+async def admin_reload(x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Rebuild model, vectorizer and signature index in the background and swap
+    them in. Requests already running finish on the old version.
+    """
+    require_admin(x_admin_token)
+    res = await asyncio.to_thread(load_resources)
+    return {"model_version": res.version, "reload": RELOAD_STATUS, "resources": RESOURCE_STATUS}
+
+@app.get("/healthz")
+def healthz():
+    """Liveness: the process is up and serving."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+def readyz():
+    """Readiness: 200 once every resource has loaded (or is known to be absent)."""
+    ready = all(info["state"] in ("ready", "missing") for info in RESOURCE_STATUS.values())
+    body = {"ready": ready, "model_version": resources.version, "resources": RESOURCE_STATUS}
+    return JSONResponse(body, status_code=200 if ready else 503)
+
 @app.get("/")
 def read_root():
     return {"message": "Cyber CTI API with Dataset & Groq Support is Running"}
@@ -0,0 +1,58 @@
+"""
+In-process counters and latency samples for the backend, exposed on
+GET /metrics.
+
+Both are per worker process and reset on restart.
+"""
+import threading
+from collections import Counter, deque
+
+_lock = threading.Lock()
+_counters = Counter()
+
+
+def inc(name, amount=1):
+    with _lock:
+        _counters[name] += amount
+
+
+def get(name):
+    with _lock:
+        return _counters[name]
+
+
+def snapshot(prefix=""):
+    with _lock:
+        return {k: v for k, v in sorted(_counters.items()) if k.startswith(prefix)}
+
+
+def ratio(numerator, denominator):
+    """Safe division for derived rates in /metrics."""
+    d = get(denominator)
+    return round(get(numerator) / d, 4) if d else 0.0
+
+
+# Latency samples: the most recent SAMPLE_WINDOW observations per name
+SAMPLE_WINDOW = 1024
+_samples = {}
+
+
+def observe(name, value):
+    with _lock:
+        window = _samples.get(name)
+        if window is None:
+            window = _samples[name] = deque(maxlen=SAMPLE_WINDOW)
+        window.append(value)
+
+
+def summary(name):
+    """count / p50 / p95 / max over the recent window, for /metrics."""
+    with _lock:
+        values = sorted(_samples.get(name, ()))
+    if not values:
+        return {"count": 0}
+
+    def pick(q):
+        return round(values[min(len(values) - 1, int(q * len(values)))], 4)
+
+    return {"count": len(values), "p50": pick(0.5), "p95": pick(0.95), "max": round(values[-1], 4)}
@@ -0,0 +1,168 @@
+"""
+Parallel model selection for train_model.py --select.
+
+Evaluates a grid of vectorizer x classifier configurations with stratified
+cross-validation, one configuration per process-pool task. Besides
+accuracy, every configuration records what it costs to serve: fit time,
+single-text latency through the serving path (vectorizer.transform +
+compile_forest, as main.py scores /analyze) and pickled artifact size.
+The leaderboard marks the configurations on the accuracy/latency Pareto
+front, so a model can be picked on the trade-off rather than accuracy
+alone.
+"""
+import csv
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from features import HashingFeatures
+from model_store import compile_forest
+
+VECTORIZERS = {
+    "tfidf-1k": {"kind": "tfidf", "max_features": 1000},
+    "tfidf-5k": {"kind": "tfidf", "max_features": 5000},
+    "hash-2^12": {"kind": "hashing", "n_features": 2 ** 12},
+    "hash-2^14": {"kind": "hashing", "n_features": 2 ** 14},
+}
+
+CLASSIFIERS = {
+    "rf-50": {"kind": "rf", "n_estimators": 50},
+    "rf-100": {"kind": "rf", "n_estimators": 100},
+    "rf-100-d20": {"kind": "rf", "n_estimators": 100, "max_depth": 20},
+    "rf-200": {"kind": "rf", "n_estimators": 200},
+    "sgd": {"kind": "sgd"},
+    "nb": {"kind": "nb"},
+}
+
+LEADERBOARD_FIELDS = [
+    "rank", "config", "vectorizer", "classifier", "cv_accuracy", "cv_std",
+    "fit_s", "latency_ms", "artifact_kb", "pareto",
+]
+# Single-text predictions timed per configuration (median is reported)
+LATENCY_SAMPLES = 200
+
+
+def build_vectorizer(spec):
+    if spec["kind"] == "hashing":
+        return HashingFeatures(n_features=spec["n_features"])
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    return TfidfVectorizer(stop_words="english", max_features=spec["max_features"])
+
+
+def build_classifier(spec):
+    if spec["kind"] == "sgd":
+        from sklearn.linear_model import SGDClassifier
+        return SGDClassifier(loss="log_loss", alpha=1e-5, random_state=42)
+    if spec["kind"] == "nb":
+        from sklearn.naive_bayes import MultinomialNB
+        return MultinomialNB()
+    from sklearn.ensemble import RandomForestClassifier
+    params = {k: v for k, v in spec.items() if k != "kind"}
+    # One core per task: parallelism comes from the process pool
+    return RandomForestClassifier(random_state=42, n_jobs=1, **params)
+
+
+def serving_latency_ms(model, vectorizer, texts):
+    """Median single-text latency through the same path main.py serves."""
+    served = compile_forest(model)
+    timings = []
+    for i in range(LATENCY_SAMPLES):
+        text = [texts[i % len(texts)]]
+        t0 = time.perf_counter()
+        served.predict_proba(vectorizer.transform(text))
+        timings.append(time.perf_counter() - t0)
+    return float(np.median(timings)) * 1e3
+
+
+def evaluate_config(vec_name, clf_name, texts, labels, folds):
+    """Worker task: cross-validate one configuration and measure its serving cost."""
+    from sklearn.model_selection import StratifiedKFold
+
+    texts = np.asarray(texts, dtype=object)
+    labels = np.asarray(labels, dtype=object)
+    scores, fit_times = [], []
+    for train_idx, test_idx in StratifiedKFold(folds, shuffle=True, random_state=42).split(texts, labels):
+        vectorizer = build_vectorizer(VECTORIZERS[vec_name])
+        model = build_classifier(CLASSIFIERS[clf_name])
+        t0 = time.perf_counter()
+        X_train = vectorizer.fit_transform(texts[train_idx].tolist())
+        model.fit(X_train, labels[train_idx])
+        fit_times.append(time.perf_counter() - t0)
+        pred = model.predict(vectorizer.transform(texts[test_idx].tolist()))
+        scores.append(float((pred == labels[test_idx]).mean()))
+
+    # Latency and size from the last fold's artifacts
+    artifact_bytes = len(pickle.dumps(model)) + len(pickle.dumps(vectorizer))
+    return {
+        "config": f"{vec_name}+{clf_name}",
+        "vectorizer": vec_name,
+        "classifier": clf_name,
+        "cv_accuracy": float(np.mean(scores)),
+        "cv_std": float(np.std(scores)),
+        "fit_s": float(np.mean(fit_times)),
+        "latency_ms": serving_latency_ms(model, vectorizer, texts[test_idx].tolist()),
+        "artifact_kb": artifact_bytes / 1024,
+    }
+
+
+def mark_pareto(rows):
+    """A config is on the front if no other is at least as accurate and strictly faster."""
+    for row in rows:
+        row["pareto"] = not any(
+            other is not row
+            and other["cv_accuracy"] >= row["cv_accuracy"]
+            and other["latency_ms"] < row["latency_ms"]
+            for other in rows
+        )
+
+
+def write_leaderboard(rows, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=LEADERBOARD_FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({
+                **row,
+                "cv_accuracy": f"{row['cv_accuracy']:.4f}",
+                "cv_std": f"{row['cv_std']:.4f}",
+                "fit_s": f"{row['fit_s']:.3f}",
+                "latency_ms": f"{row['latency_ms']:.3f}",
+                "artifact_kb": f"{row['artifact_kb']:.1f}",
+                "pareto": "yes" if row["pareto"] else "",
+            })
+
+
+def run_search(texts, labels, leaderboard_path="leaderboard.csv", workers=None, folds=5,
+               vectorizers=None, classifiers=None):
+    """Evaluate the grid in a process pool, write and print the leaderboard."""
+    texts = list(texts)
+    labels = list(labels)
+    grid = [(v, c) for v in (vectorizers or VECTORIZERS) for c in (classifiers or CLASSIFIERS)]
+    workers = workers or os.cpu_count() or 1
+    print(f"Evaluating {len(grid)} configurations, {folds}-fold CV, {workers} workers...")
+
+    rows = []
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(evaluate_config, v, c, texts, labels, folds) for v, c in grid]
+        for future in as_completed(futures):
+            row = future.result()
+            rows.append(row)
+            print(f"  {row['config']:<24} acc {row['cv_accuracy']:.4f}  {row['latency_ms']:.3f} ms")
+
+    rows.sort(key=lambda r: (-r["cv_accuracy"], r["latency_ms"]))
+    mark_pareto(rows)
+    for rank, row in enumerate(rows, 1):
+        row["rank"] = rank
+    write_leaderboard(rows, leaderboard_path)
+
+    print(f"\nSearch finished in {time.perf_counter() - t0:.1f}s. Leaderboard: {leaderboard_path}")
+    print(f"{'#':>3} {'config':<24} {'accuracy':>12} {'fit (s)':>8} {'latency (ms)':>13} {'size (KB)':>10}  pareto")
+    for row in rows:
+        print(f"{row['rank']:>3} {row['config']:<24} {row['cv_accuracy']:>7.4f}±{row['cv_std']:.3f} "
+              f"{row['fit_s']:>8.3f} {row['latency_ms']:>13.3f} {row['artifact_kb']:>10.1f}  "
+              f"{'*' if row['pareto'] else ''}")
+    return rows
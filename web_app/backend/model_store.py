@@ -0,0 +1,242 @@
+"""
+Shared-memory serving format for the RandomForest.
+
+Unpickling a RandomForestClassifier gives every uvicorn worker a private
+copy of every tree (sklearn copies node arrays on unpickle, so joblib's
+mmap_mode does not help). Here the forest is flattened into plain .npy
+arrays that each worker opens with np.load(mmap_mode="r"). The pages live
+in the OS page cache once and are shared by every worker process.
+
+The same flat layout also serves in-process (compile_forest): walking all
+trees together with a few vectorized NumPy steps per depth level is much
+cheaper for one row than sklearn's per-tree, joblib-dispatched predict_proba.
+
+Export once (the backend also does this on first start in shared mode;
+model/train_model.py does it after training):
+    python model_store.py export ../../model/v1 ../../model/v1/shared
+
+Exporting and loading an export happen under export_lock, so workers
+starting together export once and all map the same files, and an export
+is never swapped out while another process is opening it.
+"""
+import contextlib
+import json
+import os
+import pickle
+import shutil
+import sys
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no lock, exports are rare and done by one process
+    fcntl = None
+
+SHARED_FORMAT_VERSION = 1
+# Rows scored per pass; bounds the dense copy of X and the per-(row, tree) node arrays
+PREDICT_CHUNK_ROWS = 1024
+# The flat walk wins on per-call overhead; sklearn's threaded C loop wins on
+# big batches. compile_forest keeps the sklearn model for batches this large.
+FALLBACK_MIN_ROWS = 256
+ARRAYS = ("feature", "threshold", "left", "right", "value", "roots")
+
+
+def flatten_forest(model):
+    """
+    Concatenate all trees into one set of node arrays. Child indices are
+    made absolute so a node id means the same thing across the whole forest.
+    Leaves point to themselves (and test feature 0), so a leaf is simply a
+    node whose next step does not move.
+    """
+    feature, threshold, left, right, value, roots = [], [], [], [], [], []
+    offset = 0
+    for est in model.estimators_:
+        tree = est.tree_
+        n = tree.node_count
+        is_leaf = tree.children_left == -1
+        node_ids = np.arange(n, dtype=np.int32) + offset
+
+        feature.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+        threshold.append(tree.threshold.astype(np.float64))
+        left.append(np.where(is_leaf, node_ids, tree.children_left + offset).astype(np.int32))
+        right.append(np.where(is_leaf, node_ids, tree.children_right + offset).astype(np.int32))
+        v = tree.value[:, 0, :].astype(np.float64)
+        value.append(v / np.maximum(v.sum(axis=1, keepdims=True), 1e-12))
+        roots.append(offset)
+        offset += n
+
+    return {
+        "feature": np.concatenate(feature),
+        "threshold": np.concatenate(threshold),
+        "left": np.concatenate(left),
+        "right": np.concatenate(right),
+        "value": np.concatenate(value),
+        "roots": np.asarray(roots, dtype=np.int32),
+    }
+
+
+def export_shared(model, vectorizer, out_dir, source_version=None):
+    """
+    Write the flattened forest + vectorizer to out_dir (atomically via a
+    temp dir). Hold export_lock(out_dir) if other processes may be using it.
+    """
+    tmp_dir = out_dir.rstrip(os.sep) + f".tmp{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    arrays = flatten_forest(model)
+    for name in ARRAYS:
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), np.ascontiguousarray(arrays[name]))
+    with open(os.path.join(tmp_dir, "vectorizer.pkl"), "wb") as f:
+        pickle.dump(vectorizer, f)
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump({
+            "format": SHARED_FORMAT_VERSION,
+            "classes": [str(c) for c in model.classes_],
+            "n_features": int(model.n_features_in_),
+            "n_trees": len(model.estimators_),
+            "n_nodes": int(len(arrays["feature"])),
+            "source_version": source_version,
+        }, f)
+
+    old_dir = None
+    if os.path.exists(out_dir):
+        old_dir = out_dir.rstrip(os.sep) + f".old{os.getpid()}"
+        os.replace(out_dir, old_dir)
+    os.replace(tmp_dir, out_dir)
+    if old_dir:
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+
+@contextlib.contextmanager
+def export_lock(shared_dir):
+    """Exclusive inter-process lock on shared_dir (a sibling .lock file)."""
+    parent = os.path.dirname(os.path.abspath(shared_dir))
+    os.makedirs(parent, exist_ok=True)
+    with open(shared_dir.rstrip(os.sep) + ".lock", "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def read_meta(shared_dir):
+    try:
+        with open(os.path.join(shared_dir, "meta.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class FlatForest:
+    """
+    Read-only forest over flat node arrays. Exposes the subset of the
+    sklearn API the backend uses: classes_, n_features_in_ and
+    predict_proba / predict.
+    """
+
+    def __init__(self, arrays, classes, n_features, fallback=None):
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.classes_ = np.asarray(classes, dtype=object)
+        self.n_features_in_ = n_features
+        self.fallback = fallback
+
+    def _dense(self, X):
+        # sklearn casts inputs to float32 before comparing with thresholds;
+        # do the same so split decisions are identical
+        X = X.toarray() if hasattr(X, "toarray") else np.asarray(X)
+        return X.astype(np.float32).astype(np.float64)
+
+    def _predict_chunk(self, X):
+        # Every (row, tree) pair descends together, one level per step; pairs
+        # that reached a leaf drop out so shallow trees stop costing work
+        n, n_trees = X.shape[0], len(self.roots)
+        node = np.tile(self.roots.astype(np.int64), n)
+        row = np.repeat(np.arange(n), n_trees)
+        active = np.arange(n * n_trees)
+        while len(active):
+            current = node[active]
+            go_left = X[row[active], self.feature[current]] <= self.threshold[current]
+            step = np.where(go_left, self.left[current], self.right[current])
+            node[active] = step
+            active = active[step != current]
+        return self.value[node].reshape(n, n_trees, -1).mean(axis=1)
+
+    def predict_proba(self, X):
+        n = X.shape[0]
+        if self.fallback is not None and n >= FALLBACK_MIN_ROWS:
+            return self.fallback.predict_proba(X)
+        if n <= PREDICT_CHUNK_ROWS:
+            return self._predict_chunk(self._dense(X))
+        return np.vstack([
+            self._predict_chunk(self._dense(X[i:i + PREDICT_CHUNK_ROWS]))
+            for i in range(0, n, PREDICT_CHUNK_ROWS)
+        ])
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def is_forest(model):
+    return all(hasattr(est, "tree_") for est in getattr(model, "estimators_", [None]))
+
+
+def compile_forest(model, keep_fallback=True):
+    """
+    In-process FlatForest built from a fitted RandomForestClassifier. With
+    keep_fallback, batches of FALLBACK_MIN_ROWS or more go to the original model.
+    Models that are not tree ensembles (e.g. incremental.py's linear model)
+    are returned unchanged.
+    """
+    if not is_forest(model):
+        return model
+    return FlatForest(
+        flatten_forest(model), [str(c) for c in model.classes_], int(model.n_features_in_),
+        fallback=model if keep_fallback else None,
+    )
+
+
+class SharedForest(FlatForest):
+    """FlatForest whose node arrays are memory-mapped from an export directory."""
+
+    def __init__(self, shared_dir):
+        meta = read_meta(shared_dir)
+        if meta is None or meta.get("format") != SHARED_FORMAT_VERSION:
+            raise ValueError(f"No shared model export in {shared_dir}")
+        self.meta = meta
+        arrays = {
+            name: np.load(os.path.join(shared_dir, f"{name}.npy"), mmap_mode="r")
+            for name in ARRAYS
+        }
+        super().__init__(arrays, meta["classes"], meta["n_features"])
+
+
+def parity_error(model, forest, X):
+    """Largest absolute difference between sklearn's and the flat forest's probabilities."""
+    return float(np.abs(model.predict_proba(X) - forest.predict_proba(X)).max())
+
+
+def load_shared(shared_dir):
+    """Return (SharedForest, vectorizer) from an export directory."""
+    forest = SharedForest(shared_dir)
+    with open(os.path.join(shared_dir, "vectorizer.pkl"), "rb") as f:
+        vectorizer = pickle.load(f)
+    return forest, vectorizer
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "export":
+        sys.exit("usage: python model_store.py export MODEL_DIR OUT_DIR")
+    model_dir, out_dir = sys.argv[2], sys.argv[3]
+    with open(os.path.join(model_dir, "model.pkl"), "rb") as f:
+        model = pickle.load(f)
+    with open(os.path.join(model_dir, "vectorizer.pkl"), "rb") as f:
+        vectorizer = pickle.load(f)
+    with export_lock(out_dir):
+        export_shared(model, vectorizer, out_dir)
+    print(f"Exported {len(model.estimators_)} trees to {out_dir}")
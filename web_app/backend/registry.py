@@ -0,0 +1,247 @@
+"""
+Versioned on-disk model registry.
+
+One registry (the repo's model/ directory by default) replaces the two
+copies of model.pkl / vectorizer.pkl that the backend and the Streamlit
+page loaded from cwd-relative paths:
+
+    model/
+        train_model.py
+        CURRENT              <- name of the active version
+        v1/
+            manifest.json    <- checksums, metrics, feature config, load stats
+            model.pkl
+            vectorizer.pkl
+            shared/          <- derived flat export (model_store.py), optional
+        v2/ ...
+
+resolve() picks a version from the manifest alone (explicit version,
+MODEL_VERSION, CURRENT, else the newest), and load() checks every file's
+SHA-256 against the manifest before anything is unpickled.
+
+CLI (from web_app/backend):
+    python registry.py list
+    python registry.py verify [VERSION]
+    python registry.py use VERSION
+    python registry.py import DIR        # publish model.pkl/vectorizer.pkl from DIR
+"""
+import json
+import os
+import pickle
+import shutil
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.normpath(os.path.join(BACKEND_DIR, "..", ".."))
+REGISTRY_DIR = os.getenv("THREATNET_MODEL_REGISTRY", os.path.join(REPO_ROOT, "model"))
+
+# Same file hashing as the dataset cache (repo root)
+sys.path.append(REPO_ROOT)
+from dataset_cache import file_sha256
+ARTIFACTS = ("model.pkl", "vectorizer.pkl")
+MANIFEST = "manifest.json"
+CURRENT = "CURRENT"
+
+
+class RegistryError(Exception):
+    """Missing version, manifest or artifact, or a checksum mismatch."""
+
+
+class ModelEntry:
+    def __init__(self, version, path, manifest):
+        self.version = version
+        self.path = path
+        self.manifest = manifest
+
+    def artifact(self, name):
+        return os.path.join(self.path, name)
+
+    def __repr__(self):
+        return f"ModelEntry({self.version!r}, {self.path!r})"
+
+
+def _version_number(name):
+    return int(name[1:]) if name.startswith("v") and name[1:].isdigit() else -1
+
+
+def _write_text(path, text):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def list_versions(root=REGISTRY_DIR):
+    """Version names with a manifest, oldest first."""
+    if not os.path.isdir(root):
+        return []
+    names = [
+        name for name in os.listdir(root)
+        if _version_number(name) >= 0 and os.path.exists(os.path.join(root, name, MANIFEST))
+    ]
+    return sorted(names, key=_version_number)
+
+
+def current_version(root=REGISTRY_DIR):
+    try:
+        with open(os.path.join(root, CURRENT)) as f:
+            name = f.read().strip()
+        if name:
+            return name
+    except OSError:
+        pass
+    versions = list_versions(root)
+    return versions[-1] if versions else None
+
+
+def set_current(version, root=REGISTRY_DIR):
+    if version not in list_versions(root):
+        raise RegistryError(f"Unknown model version {version!r} in {root}")
+    _write_text(os.path.join(root, CURRENT), version + "\n")
+
+
+def resolve(version=None, root=REGISTRY_DIR):
+    """ModelEntry for version, else MODEL_VERSION, else CURRENT, else the newest."""
+    version = version or os.getenv("MODEL_VERSION") or current_version(root)
+    if not version:
+        raise RegistryError(f"No model versions in {root}")
+    path = os.path.join(root, version)
+    try:
+        with open(os.path.join(path, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        raise RegistryError(f"Model version {version!r}: unreadable manifest ({e})")
+    return ModelEntry(version, path, manifest)
+
+
+def verify(entry):
+    """Raise RegistryError unless every artifact matches its manifest size and checksum."""
+    problems = []
+    for name, info in entry.manifest.get("files", {}).items():
+        path = entry.artifact(name)
+        if not os.path.exists(path):
+            problems.append(f"{name} missing")
+        elif os.path.getsize(path) != info["bytes"]:
+            problems.append(f"{name} size {os.path.getsize(path)} != {info['bytes']}")
+        elif file_sha256(path) != info["sha256"]:
+            problems.append(f"{name} checksum mismatch")
+    missing = [name for name in ARTIFACTS if name not in entry.manifest.get("files", {})]
+    problems.extend(f"{name} not in manifest" for name in missing)
+    if problems:
+        raise RegistryError(f"Model version {entry.version!r} failed verification: {'; '.join(problems)}")
+
+
+def load(entry, check=True):
+    """Verify (unless check=False) and unpickle. Returns (model, vectorizer)."""
+    if check:
+        verify(entry)
+    with open(entry.artifact("model.pkl"), "rb") as f:
+        model = pickle.load(f)
+    with open(entry.artifact("vectorizer.pkl"), "rb") as f:
+        vectorizer = pickle.load(f)
+    return model, vectorizer
+
+
+def publish(model, vectorizer, root=REGISTRY_DIR, metrics=None, features=None, training=None,
+            make_current=True):
+    """
+    Write a new immutable version directory (built in a temp dir, then
+    renamed into place) and optionally point CURRENT at it.
+    """
+    def write(tmp_dir):
+        for name, obj in (("model.pkl", model), ("vectorizer.pkl", vectorizer)):
+            with open(os.path.join(tmp_dir, name), "wb") as f:
+                pickle.dump(obj, f)
+
+    return _publish(write, root, metrics, features, training, make_current)
+
+
+def import_dir(src_dir, root=REGISTRY_DIR, training=None, make_current=True):
+    """
+    Publish model.pkl / vectorizer.pkl from src_dir as a new version. The
+    files are copied byte for byte, never re-pickled, so the checksums are
+    those of the originals.
+    """
+    def write(tmp_dir):
+        for name in ARTIFACTS:
+            shutil.copyfile(os.path.join(src_dir, name), os.path.join(tmp_dir, name))
+
+    return _publish(write, root, training={"imported_from": src_dir, **(training or {})},
+                    make_current=make_current)
+
+
+def _publish(write, root, metrics=None, features=None, training=None, make_current=True):
+    os.makedirs(root, exist_ok=True)
+    versions = list_versions(root)
+    version = f"v{_version_number(versions[-1]) + 1 if versions else 1}"
+    tmp_dir = os.path.join(root, f".{version}.tmp{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    write(tmp_dir)
+
+    files, load_stats, loaded = {}, {}, {}
+    for name in ARTIFACTS:
+        path = os.path.join(tmp_dir, name)
+        files[name] = {"sha256": file_sha256(path), "bytes": os.path.getsize(path)}
+        # Untimed first load: it also imports the modules the pickle refers to
+        with open(path, "rb") as f:
+            pickle.load(f)
+        t0 = time.perf_counter()
+        with open(path, "rb") as f:
+            loaded[name] = pickle.load(f)
+        load_stats[f"{name}_ms"] = round((time.perf_counter() - t0) * 1e3, 3)
+    model, vectorizer = loaded["model.pkl"], loaded["vectorizer.pkl"]
+
+    manifest = {
+        "version": version,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "files": files,
+        "model": {"class": type(model).__name__, "n_classes": len(getattr(model, "classes_", []))},
+        "features": features or {"class": type(vectorizer).__name__},
+        "metrics": metrics or {},
+        "training": training or {},
+        "load_stats": load_stats,
+    }
+    with open(os.path.join(tmp_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    path = os.path.join(root, version)
+    os.replace(tmp_dir, path)
+    if make_current:
+        set_current(version, root)
+    return ModelEntry(version, path, manifest)
+
+
+def _main(argv):
+    usage = "usage: python registry.py list | verify [VERSION] | use VERSION | import DIR"
+    if not argv:
+        sys.exit(usage)
+    cmd, rest = argv[0], argv[1:]
+    if cmd == "list":
+        current = current_version()
+        for name in list_versions():
+            m = resolve(name).manifest
+            acc = m.get("metrics", {}).get("accuracy")
+            print(f"{'*' if name == current else ' '} {name:<6} {m.get('created_at', ''):<21} "
+                  f"{m['model']['class']:<24} {m['features'].get('class', ''):<16} "
+                  f"acc {acc if acc is not None else 'n/a'}")
+    elif cmd == "verify":
+        entry = resolve(rest[0] if rest else None)
+        verify(entry)
+        print(f"{entry.version}: OK")
+    elif cmd == "use" and rest:
+        set_current(rest[0])
+        print(f"CURRENT -> {rest[0]}")
+    elif cmd == "import" and rest:
+        entry = import_dir(rest[0])
+        print(f"Published {entry.version} from {rest[0]}")
+    else:
+        sys.exit(usage)
+
+
+if __name__ == "__main__":
+    try:
+        _main(sys.argv[1:])
+    except RegistryError as e:
+        sys.exit(str(e))
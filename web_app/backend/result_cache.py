@@ -0,0 +1,203 @@
+"""
+Content-addressed cache for /analyze results.
+
+Keys are a SHA-256 of the exact input text plus message_type and the
+resource generation (model + dataset version). The text is not normalized:
+match offsets and matched patterns are positions in that exact string, so
+only an identical resubmission may replay them.
+The in-memory tier is an LRU bounded by entry count and approximate size,
+with TTL expiry. An optional SQLite tier keeps entries across restarts;
+expired rows are pruned every DB_PRUNE_EVERY writes and on open, and the
+table is capped at db_max_rows (oldest expiry dropped first). aget/aset run
+the SQLite side in a worker thread so the event loop never waits on disk.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# SQLite writes between prunes of expired / excess rows
+DB_PRUNE_EVERY = 256
+
+
+def cache_key(text, message_type, version=""):
+    """version is the resource generation that produced the result, so a
+    restart on a different model never replays the old model's verdicts."""
+    raw = f"{version}\0{message_type}\0{text}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, ttl=3600, db_path=None,
+                 db_max_rows=100000):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.db_max_rows = db_max_rows
+        self._db_writes = 0
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # SQLite has its own lock so a slow commit never holds up the memory tier
+        self._db_lock = threading.Lock()
+        self._db = None
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS analysis_cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS analysis_cache_expiry ON analysis_cache (expires_at)")
+            with self._db_lock:
+                self._prune_db()
+            self._db.commit()
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        value = self._get_memory(key)
+        if value is None and self._db is not None:
+            value = self._get_db(key)
+        return value
+
+    async def aget(self, key):
+        """get() with the SQLite lookup in a worker thread."""
+        if not self.enabled:
+            return None
+        value = self._get_memory(key)
+        if value is None and self._db is not None:
+            value = await asyncio.to_thread(self._get_db, key)
+        return value
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+        encoded, expires_at = self._set_memory(key, value)
+        if self._db is not None:
+            self._set_db(key, encoded, expires_at)
+
+    async def aset(self, key, value):
+        """set() with the SQLite write in a worker thread."""
+        if not self.enabled:
+            return
+        encoded, expires_at = self._set_memory(key, value)
+        if self._db is not None:
+            await asyncio.to_thread(self._set_db, key, encoded, expires_at)
+
+    def invalidate(self, key=None):
+        """Drop one key, or everything when key is None. Returns entries removed."""
+        with self._lock:
+            if key is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                self._bytes = 0
+            else:
+                removed = 1 if key in self._entries else 0
+                self._drop(key)
+        if self._db is not None:
+            with self._db_lock:
+                if key is None:
+                    cursor = self._db.execute("DELETE FROM analysis_cache")
+                else:
+                    cursor = self._db.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+                removed = max(removed, cursor.rowcount)
+                self._db.commit()
+        return removed
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "sqlite": self._db is not None,
+            "sqlite_max_rows": self.db_max_rows if self._db is not None else None,
+        }
+
+    def _get_memory(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, _, value = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                return value
+            self._drop(key)
+            return None
+
+    def _set_memory(self, key, value):
+        encoded = json.dumps(value, default=str)
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store(key, value, encoded, expires_at)
+        return encoded, expires_at
+
+    def _get_db(self, key):
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM analysis_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= time.time():
+                self._db.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+        value = json.loads(row[0])
+        with self._lock:
+            self._store(key, value, row[0], row[1])
+        return value
+
+    def _set_db(self, key, encoded, expires_at):
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO analysis_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, encoded, expires_at),
+            )
+            self._db_writes += 1
+            if self._db_writes % DB_PRUNE_EVERY == 0:
+                self._prune_db()
+            self._db.commit()
+
+    # Callers hold self._db_lock
+    def _prune_db(self):
+        """Delete expired rows, then the soonest-expiring rows over db_max_rows."""
+        self._db.execute("DELETE FROM analysis_cache WHERE expires_at <= ?", (time.time(),))
+        excess = self._db.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0] - self.db_max_rows
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM analysis_cache WHERE key IN "
+                "(SELECT key FROM analysis_cache ORDER BY expires_at LIMIT ?)",
+                (excess,),
+            )
+
+    # Callers hold self._lock
+    def _store(self, key, value, encoded, expires_at):
+        size = len(encoded)
+        if size > self.max_bytes:
+            return
+        self._drop(key)
+        self._entries[key] = (expires_at, size, value)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            old_key = next(iter(self._entries))
+            self._drop(old_key)
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
@@ -0,0 +1,239 @@
+"""
+Offline bulk scanner for ThreatNet.
+
+Runs the same dataset/heuristic and ML engines as the API over a directory of
+.eml, .log/.txt or .csv files, fanned out over a process pool. Model,
+vectorizer and signature set are loaded once per worker process. LLM-free by
+default so it can run air-gapped; pass --llm to also ask Groq per record.
+
+Usage (from web_app/backend):
+    python scan.py ../../samples --out results.csv
+    python scan.py mail/ logs/ --out results.parquet --workers 8
+"""
+import argparse
+import csv
+import email
+import email.policy
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from analysis import (
+    DEFAULT_DATASET_PATH, load_model_artifacts, load_signature_dataset,
+    dataset_verdict, ml_verdicts, build_analysis_payload
+)
+from llm_output import parse_ai_result
+# Repo root, on sys.path via analysis
+from table_sinks import CsvSink, ParquetSink
+from keywords import KeywordEngine, PATTERN_DIR
+from model_store import compile_forest
+import registry
+
+SCAN_EXTENSIONS = {".eml", ".log", ".txt", ".csv"}
+CSV_TEXT_COLUMNS = ("text", "threat_text", "message", "body")
+
+RESULT_FIELDS = [
+    "file", "record", "text",
+    "dataset_threat", "dataset_confidence", "dataset_method", "report_ids",
+    "ml_prediction", "ml_confidence",
+    "ai_threat", "ai_confidence",
+]
+# Parquet column types; the rest are strings
+RESULT_TYPES = {
+    "record": "int64", "dataset_confidence": "float64", "ml_confidence": "float64", "ai_confidence": "float64",
+}
+
+# Per-process engines, filled in by _init_worker
+_engine = {}
+
+
+def _init_worker(model_dir, dataset_path, pattern_dir, use_llm):
+    model, vectorizer = load_model_artifacts(model_dir)
+    if model is not None:
+        model = compile_forest(model)
+    _, signature_index = load_signature_dataset(dataset_path)
+    keyword_engine = KeywordEngine(pattern_dir=pattern_dir)
+    keyword_engine.reload()
+    _engine.update(
+        model=model,
+        vectorizer=vectorizer,
+        signature_index=signature_index,
+        keyword_engine=keyword_engine,
+        llm_client=None,
+    )
+    if use_llm:
+        from llm_client import SyncLLMClient
+        _engine["llm_client"] = SyncLLMClient(
+            os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions"),
+            os.getenv("GROQ_API_KEY") or os.getenv("VITE_GROQ_API_KEY"),
+        )
+
+
+# --- RECORD READERS ---
+def read_eml(path):
+    with open(path, "rb") as f:
+        msg = email.message_from_binary_file(f, policy=email.policy.default)
+    parts = [msg.get("subject", "")]
+    body = msg.get_body(preferencelist=("plain", "html"))
+    if body is not None:
+        parts.append(body.get_content())
+    yield " ".join(p for p in parts if p)
+
+
+def read_lines(path):
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+
+
+def read_csv(path):
+    with open(path, encoding="utf-8", errors="replace", newline="") as f:
+        reader = csv.DictReader(f)
+        fields = reader.fieldnames or []
+        column = next((c for c in fields if c.lower() in CSV_TEXT_COLUMNS), fields[0] if fields else None)
+        if column is None:
+            return
+        for row in reader:
+            text = (row.get(column) or "").strip()
+            if text:
+                yield text
+
+
+def iter_records(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".eml":
+        return read_eml(path)
+    if ext == ".csv":
+        return read_csv(path)
+    return read_lines(path)
+
+
+def collect_files(paths, extensions=SCAN_EXTENSIONS):
+    """Files named directly, plus those under directories whose extension is in extensions."""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in sorted(names):
+                    if os.path.splitext(name)[1].lower() in extensions:
+                        yield os.path.join(root, name)
+        elif os.path.isfile(path):
+            yield path
+
+
+# --- SCANNING ---
+def _ask_llm(text):
+    from llm_client import CircuitOpenError, LLMError
+    try:
+        return parse_ai_result(_engine["llm_client"].chat(build_analysis_payload(text, "log")))
+    except CircuitOpenError:
+        # Groq is down: the record keeps its local verdicts
+        pass
+    except (LLMError, ValueError, KeyError, IndexError) as e:
+        print(f"Groq API Error: {e}", file=sys.stderr)
+    return None
+
+
+def _score_batch(path, start, texts):
+    rows = []
+    ml = [None] * len(texts)
+    if _engine["model"] is not None:
+        ml = ml_verdicts(texts, _engine["model"], _engine["vectorizer"])
+    for offset, (text, ml_result) in enumerate(zip(texts, ml)):
+        ds = dataset_verdict(text.lower(), _engine["signature_index"], _engine["keyword_engine"])
+        ai = _ask_llm(text) if _engine["llm_client"] is not None else None
+        rows.append({
+            "file": path,
+            "record": start + offset,
+            "text": text[:200],
+            "dataset_threat": ds["threat_type"],
+            "dataset_confidence": ds["confidence"],
+            "dataset_method": ds["method"],
+            "report_ids": ";".join(map(str, ds.get("matched_report_ids", []))),
+            "ml_prediction": ml_result["prediction"] if ml_result else None,
+            "ml_confidence": ml_result["confidence"] if ml_result else None,
+            "ai_threat": ai.get("threat_type") if ai else None,
+            "ai_confidence": ai.get("confidence") if ai else None,
+        })
+    return rows
+
+
+def scan_file(path, batch_size):
+    """Worker task: score every record in one file, batch_size records per ML call."""
+    rows = []
+    batch = []
+    record = 0
+    try:
+        for text in iter_records(path):
+            batch.append(text)
+            if len(batch) >= batch_size:
+                rows.extend(_score_batch(path, record, batch))
+                record += len(batch)
+                batch = []
+        if batch:
+            rows.extend(_score_batch(path, record, batch))
+    except Exception as e:
+        print(f"Error scanning {path}: {e}", file=sys.stderr)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline ThreatNet bulk scanner")
+    parser.add_argument("paths", nargs="+", help="files or directories to scan")
+    parser.add_argument("--out", required=True, help="output file (.csv or .parquet)")
+    parser.add_argument("--format", choices=["csv", "parquet"], help="defaults to the --out extension")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=512, help="records per ML call")
+    parser.add_argument("--model-version", help="registry version (default: MODEL_VERSION or model/CURRENT)")
+    parser.add_argument("--model-dir", help="plain model.pkl/vectorizer.pkl directory instead of the registry")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET_PATH)
+    parser.add_argument("--pattern-dir", default=PATTERN_DIR)
+    parser.add_argument("--llm", action="store_true", help="also query Groq for every record (needs network)")
+    args = parser.parse_args()
+
+    model_dir = args.model_dir
+    if model_dir is None:
+        # Verify once here; workers then unpickle the checked files
+        try:
+            entry = registry.resolve(args.model_version)
+            registry.verify(entry)
+        except registry.RegistryError as e:
+            sys.exit(str(e))
+        model_dir = entry.path
+        print(f"Using model {entry.version}")
+
+    fmt = args.format or ("parquet" if args.out.lower().endswith(".parquet") else "csv")
+    files = list(collect_files(args.paths))
+    if not files:
+        sys.exit("No .eml/.log/.txt/.csv files found.")
+
+    if fmt == "parquet":
+        sink = ParquetSink(args.out, RESULT_FIELDS, RESULT_TYPES)
+    else:
+        sink = CsvSink(args.out, RESULT_FIELDS)
+    total = 0
+    t0 = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(
+            max_workers=args.workers,
+            initializer=_init_worker,
+            initargs=(model_dir, args.dataset, args.pattern_dir, args.llm),
+        ) as pool:
+            futures = [pool.submit(scan_file, path, args.batch_size) for path in files]
+            for future in as_completed(futures):
+                rows = future.result()
+                sink.write([[row[f] for f in RESULT_FIELDS] for row in rows])
+                total += len(rows)
+    finally:
+        sink.close()
+
+    elapsed = time.perf_counter() - t0
+    print(f"Scanned {total} records from {len(files)} files in {elapsed:.2f}s "
+          f"({total / elapsed:.0f} records/s, {args.workers} workers, LLM {'on' if args.llm else 'off'}).")
+    print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Compiled threat-signature index.
+
+Every `threat_text` from the dataset is loaded into one Aho-Corasick automaton
+so a single pass over the input finds every known signature it contains,
+instead of a substring check per dataset row.
+"""
+from collections import deque
+
+try:
+    import ahocorasick  # pyahocorasick (C extension)
+except ImportError:
+    ahocorasick = None
+
+# Signatures this short match too much ordinary text to be useful.
+MIN_SIGNATURE_LENGTH = 5
+
+
+class _PyAutomaton:
+    """
+    Pure-Python Aho-Corasick fallback with the same interface subset as
+    `ahocorasick.Automaton` (add_word / make_automaton / iter).
+    """
+
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.value = [None]
+        self.out_link = [0]
+
+    def add_word(self, key, value):
+        state = 0
+        for ch in key:
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.value.append(None)
+                self.out_link.append(0)
+                self.goto[state][ch] = nxt
+            state = nxt
+        self.value[state] = value
+
+    def make_automaton(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(ch, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                # Output link: nearest suffix state that ends a signature
+                fl = self.fail[nxt]
+                self.out_link[nxt] = fl if self.value[fl] is not None else self.out_link[fl]
+
+    def iter(self, text):
+        goto, fail, value, out_link = self.goto, self.fail, self.value, self.out_link
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            s = state if value[state] is not None else out_link[state]
+            while s:
+                yield i, value[s]
+                s = out_link[s]
+
+
+def new_automaton():
+    """Return an empty automaton, preferring the C implementation."""
+    return ahocorasick.Automaton() if ahocorasick else _PyAutomaton()
+
+
+class SignatureIndex:
+    """
+    Maps lowercase signature text -> dataset rows and answers "which known
+    signatures occur in this text" in one scan.
+    """
+
+    def __init__(self, signatures, report_ids, attack_types):
+        self.signatures = []
+        self.report_ids = []
+        self.attack_types = []
+
+        automaton = new_automaton()
+        rows_by_signature = {}
+        for sig, rid, atype in zip(signatures, report_ids, attack_types):
+            sig = str(sig).lower()
+            if len(sig) < MIN_SIGNATURE_LENGTH:
+                continue
+            row = len(self.signatures)
+            self.signatures.append(sig)
+            self.report_ids.append(rid)
+            self.attack_types.append(atype)
+            rows_by_signature.setdefault(sig, []).append(row)
+
+        for sig, rows in rows_by_signature.items():
+            automaton.add_word(sig, tuple(rows))
+        if rows_by_signature:
+            automaton.make_automaton()
+
+        self._automaton = automaton
+        self._empty = not rows_by_signature
+        self.backend = "pyahocorasick" if ahocorasick else "python"
+
+    @classmethod
+    def from_dataframe(cls, df):
+        return cls(
+            df['threat_text'].tolist(),
+            df['report_id'].tolist() if 'report_id' in df.columns else ['N/A'] * len(df),
+            df['attack_type'].tolist() if 'attack_type' in df.columns else ['Spam'] * len(df),
+        )
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def match_rows(self, text_lower):
+        """Return dataset row positions of every signature found, in dataset order."""
+        if self._empty:
+            return []
+        rows = set()
+        for _, hit_rows in self._automaton.iter(text_lower):
+            rows.update(hit_rows)
+        return sorted(rows)
+
+    def match(self, text_lower):
+        """Return every matching signature as dicts, in dataset order."""
+        return [
+            {
+                "report_id": self.report_ids[r],
+                "attack_type": self.attack_types[r],
+                "signature": self.signatures[r],
+            }
+            for r in self.match_rows(text_lower)
+        ]
@@ -0,0 +1,31 @@
+"""
+Single-flight request coalescing.
+
+Concurrent callers asking for the same key share one in-flight computation
+instead of each starting their own. Only deduplicates while the first call
+is running; the result cache covers repeats after it finishes.
+"""
+import asyncio
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight = {}
+
+    def __len__(self):
+        return len(self._inflight)
+
+    async def do(self, key, factory):
+        """
+        Run `factory()` (a coroutine function) once per key at a time.
+        Returns (result, shared) where shared is True for coalesced callers.
+        """
+        future = self._inflight.get(key)
+        if future is not None:
+            # shield: one caller disconnecting must not cancel the shared work
+            return await asyncio.shield(future), True
+
+        future = asyncio.ensure_future(factory())
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(future), False
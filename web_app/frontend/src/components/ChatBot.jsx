@@ -35,6 +35,11 @@ export default function ChatBot() {
         scrollToBottom();
     }, [messages]);
 
+    // Cancel an in-flight reply when the widget unmounts; the backend then
+    // closes its upstream Groq stream as well
+    const abortRef = useRef(null);
+    useEffect(() => () => abortRef.current?.abort(), []);
+
     const sendMessage = async () => {
         if (!input.trim()) return;
 
@@ -43,25 +48,69 @@ export default function ChatBot() {
         setInput('');
         setLoading(true);
 
+        const controller = new AbortController();
+        abortRef.current = controller;
+        let started = false;
+        const appendToken = (token) => {
+            if (!started) {
+                // First token: swap the typing indicator for the reply bubble
+                started = true;
+                setLoading(false);
+                setMessages(prev => [...prev, { role: 'assistant', content: token }]);
+                return;
+            }
+            setMessages(prev => {
+                const last = prev[prev.length - 1];
+                return [...prev.slice(0, -1), { ...last, content: last.content + token }];
+            });
+        };
+
         try {
             const apiUrl = import.meta.env.VITE_API_URL || 'http://127.0.0.1:8000';
-            const response = await fetch(`${apiUrl}/chat`, {
+            const response = await fetch(`${apiUrl}/chat/stream`, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({
                     message: input,
                     history: messages.map(m => ({ role: m.role, content: m.content }))
-                })
+                }),
+                signal: controller.signal
             });
 
             if (!response.ok) throw new Error('Network response was not ok');
 
-            const data = await response.json();
-            setMessages(prev => [...prev, { role: 'assistant', content: data.reply }]);
+            // Server-sent events: "event:"/"data:" lines, blank line between events
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const events = buffer.split('\n\n');
+                buffer = events.pop();
+                for (const raw of events) {
+                    let event = 'message';
+                    let data = '';
+                    for (const line of raw.split('\n')) {
+                        if (line.startsWith('event:')) event = line.slice(6).trim();
+                        else if (line.startsWith('data:')) data += line.slice(5).trim();
+                    }
+                    if (!data) continue;
+                    const payload = JSON.parse(data);
+                    if (event === 'error') throw new Error(payload.detail);
+                    if (payload.token) appendToken(payload.token);
+                }
+            }
+            if (!started) throw new Error('Empty reply');
 
         } catch (error) {
+            if (error.name === 'AbortError') return;
             console.error("Chat error:", error);
-            setMessages(prev => [...prev, { role: 'assistant', content: "Oops! My circuits got a bit tangled. Please try again later." }]);
+            const oops = "Oops! My circuits got a bit tangled. Please try again later.";
+            // Keep whatever already streamed in, just note that it was cut short
+            if (started) appendToken(`\n\n${oops}`);
+            else setMessages(prev => [...prev, { role: 'assistant', content: oops }]);
         } finally {
             setLoading(false);
         }